@@ -0,0 +1,35 @@
+"""drop_idx_user_name_email
+
+Revision ID: 7c1e9a4d2b60
+Revises: 40e33badf9db
+Create Date: 2025-05-14 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e9a4d2b60'
+down_revision: Union[str, None] = '40e33badf9db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nothing filters users by first/last name; email lookups already hit the primary key
+    # and ix_users_email. The index was only ever created by metadata.create_all, hence IF EXISTS.
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_user_name_email")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_name_email "
+            "ON users (first_name, last_name, email)"
+        )
@@ -0,0 +1,48 @@
+"""message_conv_timestamp_desc_index
+
+Revision ID: a3f58d0c7e14
+Revises: 7c1e9a4d2b60
+Create Date: 2025-05-14 11:03:27.905512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f58d0c7e14'
+down_revision: Union[str, None] = '7c1e9a4d2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block, and it keeps messages writable during the build
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_conv_ts_desc "
+            "ON messages (conversation_id, timestamp DESC) "
+            "INCLUDE (id, is_from_agency, sender_email)"
+        )
+        # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would silently keep
+        is_valid = op.get_bind().execute(sa.text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = 'idx_message_conv_ts_desc'::regclass"
+        )).scalar()
+        if not is_valid:
+            raise RuntimeError(
+                "idx_message_conv_ts_desc is INVALID; DROP INDEX CONCURRENTLY idx_message_conv_ts_desc and re-run the migration"
+            )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_message_conv_timestamp")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_conv_timestamp "
+            "ON messages (conversation_id, timestamp)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_message_conv_ts_desc")
@@ -0,0 +1,41 @@
+"""messages_conversation_fk_on_delete_cascade
+
+Revision ID: a6d81f3c5e92
+Revises: f7b3e2a91c64
+Create Date: 2025-05-19 09:37:12.804551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d81f3c5e92'
+down_revision: Union[str, None] = 'f7b3e2a91c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_fk(ondelete: Union[str, None]) -> None:
+    # NOT VALID keeps the ACCESS EXCLUSIVE lock short; the scan happens in VALIDATE under a weaker lock
+    op.drop_constraint('messages_conversation_id_fkey', 'messages', type_='foreignkey')
+    op.execute(
+        "ALTER TABLE messages ADD CONSTRAINT messages_conversation_id_fkey "
+        "FOREIGN KEY (conversation_id) REFERENCES conversations (id)"
+        + (f" ON DELETE {ondelete}" if ondelete else "")
+        + " NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE messages VALIDATE CONSTRAINT messages_conversation_id_fkey")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_fk('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_fk(None)
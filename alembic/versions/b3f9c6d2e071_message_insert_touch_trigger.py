@@ -0,0 +1,33 @@
+"""message_insert_touch_trigger
+
+Revision ID: b3f9c6d2e071
+Revises: a6d81f3c5e92
+Create Date: 2025-05-19 15:04:48.361927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db_triggers import MESSAGES_TOUCH_CONVERSATION_TRIGGER, TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V1
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f9c6d2e071'
+down_revision: Union[str, None] = 'a6d81f3c5e92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Statement-level with a transition table: a bulk insert bumps each conversation/project once, not once per row
+    op.execute(TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V1)
+    op.execute(MESSAGES_TOUCH_CONVERSATION_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS messages_touch_conversation ON messages")
+    op.execute("DROP FUNCTION IF EXISTS touch_conversation_on_message_insert()")
@@ -0,0 +1,32 @@
+"""drop_message_created_updated_at
+
+Revision ID: b81d6e03f2c7
+Revises: e5b27c9f4a81
+Create Date: 2025-05-15 14:26:53.610478
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81d6e03f2c7'
+down_revision: Union[str, None] = 'e5b27c9f4a81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Both columns only ever duplicated `timestamp`. Dropping is a catalog-only change; the space is
+    # reclaimed as rows are rewritten (VACUUM FULL would take an ACCESS EXCLUSIVE lock, so it is left to ops).
+    op.execute("ALTER TABLE messages DROP COLUMN IF EXISTS created_at, DROP COLUMN IF EXISTS updated_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('messages', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.add_column('messages', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.execute("UPDATE messages SET created_at = timestamp, updated_at = timestamp")
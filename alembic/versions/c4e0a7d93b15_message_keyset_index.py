@@ -0,0 +1,48 @@
+"""message_keyset_index
+
+Revision ID: c4e0a7d93b15
+Revises: b81d6e03f2c7
+Create Date: 2025-05-16 10:08:35.712946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e0a7d93b15'
+down_revision: Union[str, None] = 'b81d6e03f2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination seeks on (timestamp, id), so id moves from INCLUDE into the key
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_conv_ts_id_desc "
+            "ON messages (conversation_id, timestamp DESC, id DESC) "
+            "INCLUDE (is_from_agency, sender_email)"
+        )
+        is_valid = op.get_bind().execute(sa.text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = 'idx_message_conv_ts_id_desc'::regclass"
+        )).scalar()
+        if not is_valid:
+            raise RuntimeError(
+                "idx_message_conv_ts_id_desc is INVALID; DROP INDEX CONCURRENTLY idx_message_conv_ts_id_desc and re-run the migration"
+            )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_message_conv_ts_desc")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_message_conv_ts_desc "
+            "ON messages (conversation_id, timestamp DESC) "
+            "INCLUDE (id, is_from_agency, sender_email)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_message_conv_ts_id_desc")
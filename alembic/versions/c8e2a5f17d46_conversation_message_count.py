@@ -0,0 +1,49 @@
+"""conversation_message_count
+
+Revision ID: c8e2a5f17d46
+Revises: b3f9c6d2e071
+Create Date: 2025-05-20 11:12:26.905318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db_triggers import (
+    COUNT_CONVERSATION_MESSAGE_DELETE_FN,
+    MESSAGES_COUNT_DELETE_TRIGGER,
+    TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V1,
+    TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V2,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2a5f17d46'
+down_revision: Union[str, None] = 'b3f9c6d2e071'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('message_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    # Triggers and backfill commit together, so no insert can slip between the count and the trigger
+    op.execute(TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V2)
+    op.execute(COUNT_CONVERSATION_MESSAGE_DELETE_FN)
+    op.execute(MESSAGES_COUNT_DELETE_TRIGGER)
+    op.execute("""
+        UPDATE conversations
+        SET message_count = counted.n
+        FROM (SELECT conversation_id, count(*) AS n FROM messages GROUP BY conversation_id) AS counted
+        WHERE conversations.id = counted.conversation_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS messages_count_delete ON messages")
+    op.execute("DROP FUNCTION IF EXISTS count_conversation_message_delete()")
+    op.execute(TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V1)
+    op.drop_column('conversations', 'message_count')
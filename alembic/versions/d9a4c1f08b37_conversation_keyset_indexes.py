@@ -0,0 +1,64 @@
+"""conversation_keyset_indexes
+
+Revision ID: d9a4c1f08b37
+Revises: c4e0a7d93b15
+Create Date: 2025-05-16 14:21:03.518274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a4c1f08b37'
+down_revision: Union[str, None] = 'c4e0a7d93b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_KEYSET_INDEXES = {
+    'ix_conv_user_pinned_updated_id': 'user_email',
+    'ix_conv_project_pinned_updated_id': 'project_id',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Row-value comparisons on (is_pinned, updated_at, id) never match NULL, so is_pinned must be NOT NULL
+    op.execute("UPDATE conversations SET is_pinned = false WHERE is_pinned IS NULL")
+    op.alter_column('conversations', 'is_pinned',
+               existing_type=sa.Boolean(),
+               server_default=sa.text('false'),
+               nullable=False)
+
+    with op.get_context().autocommit_block():
+        for index_name, leading_column in _KEYSET_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON conversations ({leading_column}, is_pinned DESC, updated_at DESC, id DESC)"
+            )
+            is_valid = op.get_bind().execute(sa.text(
+                f"SELECT indisvalid FROM pg_index WHERE indexrelid = '{index_name}'::regclass"
+            )).scalar()
+            if not is_valid:
+                raise RuntimeError(
+                    f"{index_name} is INVALID; DROP INDEX CONCURRENTLY {index_name} and re-run the migration"
+                )
+        # Superseded: every list query filters on the owner and sorts by is_pinned first
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_conv_user_updated")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_conv_project")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conv_user_updated ON conversations (user_email, updated_at)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conv_project ON conversations (project_id)")
+        for index_name in _KEYSET_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    op.alter_column('conversations', 'is_pinned',
+               existing_type=sa.Boolean(),
+               server_default=None,
+               nullable=True)
@@ -0,0 +1,51 @@
+"""conversation_state_columns_to_jsonb
+
+Revision ID: e5b27c9f4a81
+Revises: a3f58d0c7e14
+Create Date: 2025-05-15 09:41:08.227630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b27c9f4a81'
+down_revision: Union[str, None] = 'a3f58d0c7e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATE_COLUMNS = {
+    'shared_state': "'{}'::jsonb",
+    'threads': "'{}'::jsonb",
+    'settings': "'[]'::jsonb",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column, default in STATE_COLUMNS.items():
+        op.alter_column(
+            'conversations', column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            existing_type=sa.JSON(),
+            existing_nullable=True,
+            postgresql_using=f'{column}::jsonb',
+            server_default=sa.text(default),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in STATE_COLUMNS:
+        op.alter_column(
+            'conversations', column,
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            existing_nullable=True,
+            postgresql_using=f'{column}::json',
+            server_default=None,
+        )
@@ -0,0 +1,48 @@
+"""project_user_name_unique_index
+
+Revision ID: f7b3e2a91c64
+Revises: d9a4c1f08b37
+Create Date: 2025-05-16 16:42:57.209318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b3e2a91c64'
+down_revision: Union[str, None] = 'd9a4c1f08b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fails (and leaves an INVALID index behind) if a user already has two projects with the same name;
+    # rename the duplicates first
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_project_user_name "
+            "ON projects (user_email, name)"
+        )
+        is_valid = op.get_bind().execute(sa.text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = 'uq_project_user_name'::regclass"
+        )).scalar()
+        if not is_valid:
+            raise RuntimeError(
+                "uq_project_user_name is INVALID; DROP INDEX CONCURRENTLY uq_project_user_name, "
+                "resolve duplicate (user_email, name) projects and re-run the migration"
+            )
+        # user_email is the leading column of the unique index
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_project_user")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_projects_user_email")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_projects_user_email ON projects (user_email)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_user ON projects (user_email)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_project_user_name")
@@ -2,17 +2,28 @@ import os
 from dotenv import load_dotenv
 import json
 from datetime import datetime
-from http.client import HTTPSConnection
+import httpx
 from base64 import b64encode
 from json import loads
 from json import dumps
 import openai
 from urllib.parse import urlparse
 import base64
+from itertools import islice
 
 load_dotenv(override=True)
 
 
+# One pooled client for the process: requests to api.dataforseo.com reuse keep-alive
+# connections (and TLS sessions) instead of a fresh handshake per call. httpx.Client is
+# thread-safe, so the tools' worker threads can share it. No read timeout, as before;
+# the live endpoints can take a while.
+_http_client = httpx.Client(
+    timeout=httpx.Timeout(None, connect=10.0),
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+)
+
+
 class RestClient:
     domain = "api.dataforseo.com"
 
@@ -21,17 +32,12 @@ class RestClient:
         self.password = password
 
     def request(self, path, method, data=None):
-        connection = HTTPSConnection(self.domain)
-        try:
-            base64_bytes = b64encode(
-                ("%s:%s" % (self.username, self.password)).encode("ascii")
-                ).decode("ascii")
-            headers = {'Authorization' : 'Basic %s' %  base64_bytes, 'Content-Encoding' : 'gzip'}
-            connection.request(method, path, headers=headers, body=data)
-            response = connection.getresponse()
-            return loads(response.read().decode())
-        finally:
-            connection.close()
+        base64_bytes = b64encode(
+            ("%s:%s" % (self.username, self.password)).encode("ascii")
+            ).decode("ascii")
+        headers = {'Authorization' : 'Basic %s' %  base64_bytes, 'Content-Encoding' : 'gzip'}
+        response = _http_client.request(method, f"https://{self.domain}{path}", headers=headers, content=data)
+        return loads(response.read().decode())
 
     def get(self, path):
         return self.request(path, 'GET')
@@ -52,6 +58,8 @@ class DataForSEOClient:
     
     _login = os.getenv("DATAFORSEO_LOGIN")
     _password = os.getenv("DATAFORSEO_PASSWORD")
+    # keyword_overview accepts at most 700 keywords per task
+    KEYWORD_OVERVIEW_MAX_KEYWORDS = 700
     
     def __init__(self):
         #load_dotenv()
@@ -68,13 +76,8 @@ class DataForSEOClient:
             'Content-Encoding': 'gzip',
             'Content-Type': 'application/json'
         }
-        conn = HTTPSConnection(self.domain)
-        try:
-            conn.request(method, path, headers=headers, body=data)
-            response = conn.getresponse()
-            return json.loads(response.read().decode())
-        finally:
-            conn.close()
+        response = _http_client.request(method, f"https://{self.domain}{path}", headers=headers, content=data)
+        return json.loads(response.read().decode())
 
 
     @staticmethod
@@ -259,7 +262,50 @@ class DataForSEOClient:
             "language_name": language_name,
         }
         keyword_data = DataForSEOClient.keyword_overview_live(task_data)
+        return [
+            {'product': product_name, **metrics}
+            for metrics in DataForSEOClient._parse_keyword_overview(keyword_data)
+        ]
+
+    @staticmethod
+    def get_keyword_overview_batch(keywords_by_product, location_name, language_name):
+        """
+        get_keyword_overview for several products with as few requests as possible.
+
+        The keywords of all products are deduplicated and sent KEYWORD_OVERVIEW_MAX_KEYWORDS per
+        request (the endpoint's per-task limit), instead of one request per product. Rows come back
+        grouped by product in the order of keywords_by_product, one per keyword the API has data for.
+        A failed request is logged and its keywords are left out.
+        """
+        unique_keywords = iter(dict.fromkeys(
+            keyword.lower() for keywords in keywords_by_product.values() for keyword in keywords
+        ))
+        metrics_by_keyword = {}
+        while chunk := list(islice(unique_keywords, DataForSEOClient.KEYWORD_OVERVIEW_MAX_KEYWORDS)):
+            task_data = {0: {
+                "keywords": chunk,
+                "location_name": location_name,
+                "language_name": language_name,
+            }}
+            try:
+                keyword_data = DataForSEOClient.keyword_overview_live(task_data)
+                for metrics in DataForSEOClient._parse_keyword_overview(keyword_data):
+                    metrics_by_keyword.setdefault(metrics['keyword'].lower(), metrics)
+            except Exception as e:
+                print(f"Error processing keyword overview data for {len(chunk)} keywords: {str(e)}")
+
         results = []
+        for product_name, keywords in keywords_by_product.items():
+            # The API echoes keywords lowercased, so match on that
+            for keyword in dict.fromkeys(keyword.lower() for keyword in keywords):
+                metrics = metrics_by_keyword.get(keyword)
+                if metrics:
+                    results.append({'product': product_name, **metrics})
+        return results
+
+    @staticmethod
+    def _parse_keyword_overview(keyword_data):
+        """Yields keyword, search_volume, difficulty and intent for each item of a keyword_overview response."""
         for task in keyword_data['tasks']:
             if task['result'][0].get('items') and len(task['result'][0]['items']) > 0:
                 for item in task['result'][0]['items']:
@@ -273,14 +319,12 @@ class DataForSEOClient:
                     intent = search_intent.get('main_intent') if search_intent.get('main_intent') is not None else 'unknown'
 
                     if keyword:
-                        results.append({
-                            'product': product_name,
+                        yield {
                             'keyword': keyword,
                             'search_volume': search_volume,
                             'difficulty': difficulty,
                             'intent': intent
-                        })
-        return results
+                        }
 
 
 if __name__ == "__main__":
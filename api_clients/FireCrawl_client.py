@@ -6,6 +6,8 @@ from typing import Any, Optional, List
 from dotenv import load_dotenv
 import os
 import logging
+import time
+from functools import lru_cache
 import pandas as pd
 
 load_dotenv(override=True)
@@ -14,6 +16,8 @@ logger = logging.getLogger(__name__)
 
 # Define default parameters or constants if needed
 DEFAULT_TIMEOUT = 30000  # Example: 30 seconds
+# Product page summaries are reused for this long before the page is scraped again
+URL_SUMMARY_TTL_SECONDS = 7 * 24 * 60 * 60
 
 class FireCrawlClient:
     """
@@ -61,6 +65,20 @@ class FireCrawlClient:
         prompt = f"Create a consice summary for this product/service with important/significat information."
         return FireCrawlClient._extract(url, prompt, ExtractSchema)['summary']
     
+    @staticmethod
+    def extract_product_url_summary_cached(url: str) -> str:
+        """
+        extract_product_url_summary, remembered per URL in this process for up to URL_SUMMARY_TTL_SECONDS.
+        Failed scrapes are not cached.
+        """
+        return FireCrawlClient._cached_product_url_summary(url, int(time.time() // URL_SUMMARY_TTL_SECONDS))
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _cached_product_url_summary(url: str, ttl_window: int) -> str:
+        # ttl_window only keys the cache: entries from a past window are never hit again and age out
+        return FireCrawlClient.extract_product_url_summary(url)
+
     @staticmethod
     def extract_products_from_website(url: str) -> str:
         url = f"{url}/*"
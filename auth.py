@@ -5,8 +5,10 @@ from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models import User
+from repositories import UserRepository
 from typing import Optional
 from passlib.context import CryptContext
 from core.config import settings # Import centralized settings
@@ -68,11 +70,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         )
     
     token_data = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.email == token_data["email"]).first()
+    # db.get: the loaded User sits in the session's identity map, so later lookups of this email on the same session skip the SELECT
+    user = UserRepository(db).get_by_email(token_data["email"])
     if user is None:
         raise credentials_exception
     return user # Return the user ORM object 
 
+async def get_current_user_async(token: str, db: AsyncSession) -> User:
+    """get_current_user for handlers running on an AsyncSession (database.get_async_db)."""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token_data = verify_token(token, credentials_exception)
+    user = await db.get(User, token_data["email"])
+    if user is None:
+        raise credentials_exception
+    return user
+
 async def get_token_header(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
         raise HTTPException(
@@ -11,6 +11,17 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = "5432"
     POSTGRES_DB: str = "mamba_db"
     DATABASE_URL: Optional[str] = None # Will be constructed if not provided
+    # Connection pool (per worker process and per engine). The server's max_connections must cover
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW) x workers x 2 engines (sync + async), plus admin/migration headroom
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    # Test each pooled connection on checkout, so a server restart or idle-timeout drop costs a reconnect, not a failed request
+    DB_POOL_PRE_PING: bool = True
+    # Set when DATABASE_URL points at PgBouncer in transaction pooling mode: server connections are
+    # shared between clients, so asyncpg must not keep prepared statements on them
+    DB_BEHIND_PGBOUNCER: bool = False
 
     # Valkey/Redis
     VALKEY_URL: Optional[str] = None # Keep this as Optional, might not always be configured
@@ -1,11 +1,15 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 # import os # os might still be needed for other things, or can be removed if not
 # from dotenv import load_dotenv # No longer needed here, config handles it
 import redis.asyncio as redis # Valkey uses Redis protocol, so redis-py/aioredis works
 from redis.asyncio.connection import ConnectionPool
 from typing import Optional
+import orjson
 import logging # Import logging
 from core.config import settings # Import the centralized settings
 
@@ -25,18 +29,57 @@ logger = logging.getLogger(__name__)
 # DATABASE_URL = os.getenv("DATABASE_URL")
 logger.info(f"DATABASE_URL from settings: {settings.DATABASE_URL}") # Use settings
 
+def _json_serializer(value) -> str:
+    """orjson encoding for JSON/JSONB parameters; non-str dict keys are stringified like json.dumps does."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
 # Create SQLAlchemy engine with PostgreSQL-specific settings
 engine = create_engine(
     settings.DATABASE_URL, # Use settings
-    pool_size=20,  # Number of connections to keep open
-    max_overflow=10,  # Number of connections to allow beyond pool_size
-    pool_timeout=30,  # Seconds to wait before giving up on getting a connection
-    pool_recycle=1800,  # Recycle connections after 30 minutes
+    pool_size=settings.DB_POOL_SIZE,  # Number of connections to keep open
+    max_overflow=settings.DB_MAX_OVERFLOW,  # Number of connections to allow beyond pool_size
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # Seconds to wait before giving up on getting a connection
+    pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle connections after 30 minutes by default
+    pool_pre_ping=settings.DB_POOL_PRE_PING,  # Cheap liveness check on checkout; replaces dead connections transparently
+    query_cache_size=1024,  # Compiled-statement LRU; default 500 can churn across all repository statements
+    json_serializer=_json_serializer,  # The conversation state JSONB columns are the largest values we send
+    json_deserializer=orjson.loads,
+    executemany_mode="values_plus_batch",  # psycopg2: INSERTs use multi-row VALUES, UPDATE/DELETE executemany use execute_batch
     echo=False  # Set to True to see SQL queries in logs, False for production
 )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects stay usable after commit without a reload SELECT; server defaults
+# are fetched inline via INSERT/UPDATE ... RETURNING (eager_defaults) instead of a follow-up refresh()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def _async_database_url(database_url: str) -> URL:
+    """Same database as DATABASE_URL, on the asyncpg driver (which spells libpq's sslmode as ssl)."""
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return url
+
+# Async engine for handlers that await their queries instead of blocking the event loop.
+# Pools are lazy: no connection is opened until an AsyncSession is first used.
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    query_cache_size=1024,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    # asyncpg caches prepared statements per connection; PgBouncer transaction pooling hands a
+    # different server connection to each transaction, so the cache must be off there
+    connect_args={"statement_cache_size": 0, "prepared_statement_cache_size": 0} if settings.DB_BEHIND_PGBOUNCER else {},
+    echo=False
+)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create Base class
 Base = declarative_base()
@@ -53,6 +96,41 @@ def get_db():
     finally:
         db.close()
 
+# Repository writes normally commit as they go. Inside unit_of_work they only flush, and the block
+# commits once on exit, so a sequence of writes costs one WAL flush instead of one per write.
+# Keep slow work (LLM calls, HTTP requests) outside the block: its row locks last until the commit.
+@contextmanager
+def unit_of_work(db: Session):
+    outer = db.info.get("defer_commit", False)
+    db.info["defer_commit"] = True
+    try:
+        yield db
+        if not outer:
+            db.commit()
+    except Exception:
+        if not outer:
+            db.rollback()
+        raise
+    finally:
+        db.info["defer_commit"] = outer
+
+def commit_or_flush(db: Session):
+    """What repository writes call instead of commit(): flushes inside unit_of_work, commits otherwise."""
+    if db.info.get("defer_commit"):
+        db.flush()
+    else:
+        db.commit()
+
+# Dependency to get an async DB session; same commit/rollback contract as get_db
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
 # --- Valkey (Redis Compatible) Configuration ---
 # NOTE: Using Valkey (DigitalOcean Managed Redis Fork)
 # VALKEY_URL = os.getenv("VALKEY_URL") # Use settings.VALKEY_URL
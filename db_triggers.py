@@ -0,0 +1,84 @@
+# Trigger DDL for the messages table, shared by models.py (create_all) and the Alembic migrations.
+# A migration imports the constant for the version it installs, so once one has shipped its SQL
+# must not change: a new version gets a new constant and a new migration, and create_all in
+# models.py moves to it.
+
+# b3f9c6d2e071: statement-level with a transition table, so a bulk insert bumps each
+# conversation/project once, not once per row
+TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V1 = """
+    CREATE OR REPLACE FUNCTION touch_conversation_on_message_insert() RETURNS trigger AS $$
+    BEGIN
+        WITH touched_conversation AS (
+            UPDATE conversations
+            SET updated_at = now()
+            FROM (SELECT DISTINCT conversation_id FROM new_messages) AS inserted
+            WHERE conversations.id = inserted.conversation_id
+            RETURNING conversations.project_id
+        )
+        UPDATE projects
+        SET updated_at = now()
+        FROM (SELECT DISTINCT project_id FROM touched_conversation) AS touched
+        WHERE projects.id = touched.project_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# c8e2a5f17d46: also keeps conversations.message_count
+TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V2 = """
+    CREATE OR REPLACE FUNCTION touch_conversation_on_message_insert() RETURNS trigger AS $$
+    BEGIN
+        WITH inserted AS (
+            SELECT conversation_id, count(*) AS n FROM new_messages GROUP BY conversation_id
+        ),
+        touched_conversation AS (
+            UPDATE conversations
+            SET updated_at = now(), message_count = conversations.message_count + inserted.n
+            FROM inserted
+            WHERE conversations.id = inserted.conversation_id
+            RETURNING conversations.project_id
+        )
+        UPDATE projects
+        SET updated_at = now()
+        FROM (SELECT DISTINCT project_id FROM touched_conversation) AS touched
+        WHERE projects.id = touched.project_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+MESSAGES_TOUCH_CONVERSATION_TRIGGER = """
+    CREATE TRIGGER messages_touch_conversation
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_messages
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION touch_conversation_on_message_insert()
+"""
+
+COUNT_CONVERSATION_MESSAGE_DELETE_FN = """
+    CREATE OR REPLACE FUNCTION count_conversation_message_delete() RETURNS trigger AS $$
+    BEGIN
+        UPDATE conversations
+        SET message_count = conversations.message_count - deleted.n
+        FROM (SELECT conversation_id, count(*) AS n FROM old_messages GROUP BY conversation_id) AS deleted
+        WHERE conversations.id = deleted.conversation_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+MESSAGES_COUNT_DELETE_TRIGGER = """
+    CREATE TRIGGER messages_count_delete
+    AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_messages
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION count_conversation_message_delete()
+"""
+
+# What a fully migrated database has installed, in creation order; models.py attaches these for create_all
+CURRENT_MESSAGE_TRIGGER_DDL = (
+    TOUCH_CONVERSATION_ON_MESSAGE_INSERT_FN_V2,
+    MESSAGES_TOUCH_CONVERSATION_TRIGGER,
+    COUNT_CONVERSATION_MESSAGE_DELETE_FN,
+    MESSAGES_COUNT_DELETE_TRIGGER,
+)
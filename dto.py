@@ -174,6 +174,22 @@ class ConversationDto(BaseDto):
         db_dict = {k: v for k, v in dto_dict.items() if k not in exclude_fields}
         return db_dict
 
+class ConversationSummaryDto(BaseDto):
+    """List-view projection of a conversation: no JSON state, no latest message."""
+    id: str
+    name: str
+    updated_at: Optional[datetime.datetime] = None
+    is_pinned: bool = False
+    
+    def to_response_dict(self) -> Dict[str, Any]:
+        """The dict list endpoints return, with updated_at as an ISO 8601 string."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "is_pinned": self.is_pinned
+        }
+
 class CreateConversationDto(BaseDto):
     name: str
     project_id: Optional[str] = None
@@ -198,8 +214,8 @@ class MessageDto(BaseDto):
     
     @staticmethod
     def from_db_model(message):
-        """Convert a Message database model to a MessageDto."""
-        return MessageDto(
+        """Convert a Message database model to a MessageDto. Values come from the database, so validation is skipped."""
+        return MessageDto.model_construct(
             id=str(message.id),
             conversation_id=message.conversation_id,
             sender=message.sender_email,
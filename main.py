@@ -17,6 +17,8 @@ import logging
 from typing import Dict, Any, List, Optional # Ensure List and Optional are imported
 import certifi # Ensure certifi is imported before use
 from sqlalchemy.orm import Session # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
 from passlib.context import CryptContext # type: ignore
 from datetime import datetime, timedelta, timezone
 from reset_database import reset_database
@@ -24,7 +26,7 @@ from reset_pins import reset_all_pins
 
 # State and Auth
 import auth
-from auth import get_current_user, create_access_token, get_token_header, verify_google_id_token, verify_token
+from auth import get_current_user, get_current_user_async, create_access_token, get_token_header, verify_google_id_token, verify_token
 from services.user_services import register_user, login_user, rename_conversation, delete_conversation, get_conversation_details, get_user_conversations, toggle_conversation_pin, get_or_create_google_user
 from dto import (
     CreateUserDto, UserDto, LoginDto, 
@@ -39,22 +41,25 @@ from pydantic import BaseModel, Field # Add Field
 
 # Database and Models
 from database import (
-    get_db, engine, SessionLocal, 
+    get_db, get_async_db, engine, SessionLocal, async_engine, unit_of_work,
     # Rename imports for clarity
     create_valkey_pool, # Make sure this is imported
     close_valkey_pool,  # Make sure this is imported
     get_valkey_connection 
 )
 from models import Base, User as UserModel # Alias User to UserModel
+from models import Project as ProjectModel
 from models import GoogleService as GoogleServiceModel # Added
-from repositories import ConversationRepository, MessageRepository, UserRepository, ProjectRepository
+from repositories import ConversationRepository, AsyncConversationRepository, MessageRepository, UserRepository, ProjectRepository
 from services.agency_services import AgencyService
 from services.project_services import extract_project_data, generate_project_data, delete_project_and_data, update_project_specific_fields
-from services.google_oauth_service import GoogleOAuthService # Added
+from services.google_oauth_service import GoogleOAuthService, TokenStatus # Added
 from services.search_console_service import SearchConsoleService # Added
 from services.analytics_service import AnalyticsService # Added
+from utils.db_metrics import QUERY_COUNT_WARN_THRESHOLD, count_queries, merge_into_totals, register_query_listeners, server_timing_header, totals_snapshot
 # from utils.valkey_utils import publish_message_to_valkey
 import json
+import orjson
 
 # os.environ["SSL_CERT_FILE"] = certifi.where() # Set via settings if needed or ensure certifi is available
 if settings.SSL_CERT_FILE:
@@ -79,6 +84,7 @@ async def lifespan(app_instance: FastAPI): # Changed 'app' to 'app_instance' to
     logger.info("Application shutdown (lifespan)... Genta was here")
     logger.info("Closing Valkey/Redis connection pool (lifespan)... Genta was here")
     await close_valkey_pool()
+    await async_engine.dispose()
     # Add other shutdown tasks if needed
 
 app = FastAPI(
@@ -161,6 +167,25 @@ async def correlation_id_middleware(request: Request, call_next):
     
     return response
 
+# Query count middleware: surfaces per-request DB usage and flags likely N+1 regressions
+register_query_listeners(engine)
+register_query_listeners(async_engine.sync_engine)
+
+@app.middleware("http")
+async def query_count_middleware(request: Request, call_next):
+    with count_queries() as counter:
+        response = await call_next(request)
+    merge_into_totals(counter)
+    
+    response.headers["Server-Timing"] = server_timing_header(counter)
+    if counter.count > QUERY_COUNT_WARN_THRESHOLD:
+        logger.warning(
+            f"{request.method} {request.url.path} issued {counter.count} DB queries "
+            f"({counter.total_ms:.1f} ms); possible N+1"
+        )
+    
+    return response
+
 # Cache TTLs
 MESSAGES_CACHE_TTL_SECONDS = 60  # 1 minute
 # CONVERSATION_DETAILS_CACHE_TTL_SECONDS = 300 # Defined in user_services.py
@@ -172,6 +197,11 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Resolve all mapper relationships now rather than on the first query of the first request,
+# so mapping errors fail the boot instead of a user request
+Base.registry.configure()
+logger.info(f"Configured {len(Base.registry.mappers)} ORM mappers")
+
 # Removed get_user_service function
 
 # @app.options("/{path:path}")
@@ -183,6 +213,11 @@ Base.metadata.create_all(bind=engine)
 async def read_root():
      return {"message": "Welcome to Mamba FastAPI Server"}
 
+@app.get("/admin/db-metrics", tags=["Admin"])
+async def get_db_metrics(current_user: UserModel = Depends(auth.get_current_admin_user)):
+    """Process-wide DB usage since this worker started: requests counted, statements issued and time spent."""
+    return totals_snapshot()
+
 class GoogleLoginRequest(BaseModel):
     token: str # This will be the Google ID token from the frontend
 
@@ -211,7 +246,6 @@ async def subscribe_user_endpoint(db: Session = Depends(get_db), current_user: U
     current_user.token_limit = None  # Unlimited tokens upon subscription
     db.add(current_user)
     db.commit()
-    db.refresh(current_user)
 
     # Placeholder for actual subscription benefits/UI update
     return {"message": "Thanks for the support! Follow development to see the updates! You now have unlimited tokens."}
@@ -303,15 +337,17 @@ async def create_project_endpoint(
 
     project_repo = ProjectRepository(db)
     
-    # Check for existing project with the same name for the user
-    existing_project = project_repo.get_by_name_and_user(project_data.name, user_email)
-    if existing_project:
+    # Duplicate names are rejected by the uq_project_user_name index; no lookup before the INSERT
+    try:
+        new_project_model = project_repo.create_from_dto(project_data, user_email)
+    except IntegrityError as e:
+        db.rollback()
+        if not ProjectRepository.is_duplicate_name(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Project with name '{project_data.name}' already exists for this user."
         )
-        
-    new_project_model = project_repo.create_from_dto(project_data, user_email)
     return project_repo.to_dto(new_project_model)
 
 @app.get("/projects", response_model=List[ProjectDto], tags=["Projects"])
@@ -331,8 +367,7 @@ async def get_user_projects_endpoint(
         raise credentials_exception
     
     project_repo = ProjectRepository(db)
-    projects = project_repo.get_by_user_email(user_email)
-    return [project_repo.to_dto(p) for p in projects]
+    return project_repo.list_dtos_for_user(user_email)
 
 @app.post("/chat", tags=["Chat"])
 async def create_chat(
@@ -435,7 +470,6 @@ async def chat_endpoint(
                 current_user.tokens_last_reset_at = now
                 db.add(current_user)
                 db.commit()
-                db.refresh(current_user)
             
             if current_user.token_limit is None or current_user.token_limit <= 0:
                 logger.warning(f"User {current_user.email} token limit {current_user.token_limit} insufficient.")
@@ -489,37 +523,38 @@ async def chat_endpoint(
         # Get completion from agency
         agency_response = agency.get_completion(message=message)
         
-        # Decrement token for free users if operation was successful
-        if not can_have_unlimited_tokens:
-            if current_user.token_limit is not None and current_user.token_limit > 0:
-                current_user.token_limit -= 1 # Assuming 1 token per message
-                db.add(current_user)
-                db.commit()
-            # else: log or handle case where token_limit became <=0 unexpectedly after check? 
-            # For now, the check before agency.get_completion should prevent this.
-
-        # Save AI response to database
-        ai_message_dto = SendMessageDto(
-            conversation_id=conversation_id,
-            content=agency_response
-        )
-        message_repo.create_from_dto(ai_message_dto, None, is_from_agency=True)
-        
-        agency_action = agency.shared_state.get("action")
-        if agency_action:
-            response = {
-                "response": agency_response, 
-                "is_from_agency": True, 
-                "action": agency_action
-            }
-        else:
-            response = {
-                "response": agency_response, "is_from_agency": True}
+        # Token decrement, AI message and shared state commit together, after the slow completion
+        with unit_of_work(db):
+            # Decrement token for free users if operation was successful
+            if not can_have_unlimited_tokens:
+                if current_user.token_limit is not None and current_user.token_limit > 0:
+                    current_user.token_limit -= 1 # Assuming 1 token per message
+                    db.add(current_user)
+                # else: log or handle case where token_limit became <=0 unexpectedly after check? 
+                # For now, the check before agency.get_completion should prevent this.
+
+            # Save AI response to database
+            ai_message_dto = SendMessageDto(
+                conversation_id=conversation_id,
+                content=agency_response
+            )
+            message_repo.create_from_dto(ai_message_dto, None, is_from_agency=True)
             
-        if agency_action and agency_action.get("action-type") == "keywords_ready":
-            agency.shared_state.set("action", None)
-        # Save updated state
-        conversation_repo.save_shared_state(conversation_id, agency.shared_state.data)
+            agency_action = agency.shared_state.get("action")
+            if agency_action:
+                response = {
+                    "response": agency_response, 
+                    "is_from_agency": True, 
+                    "action": agency_action
+                }
+            else:
+                response = {
+                    "response": agency_response, "is_from_agency": True}
+                
+            if agency_action and agency_action.get("action-type") == "keywords_ready":
+                agency.shared_state.set("action", None)
+            # Save updated state
+            conversation_repo.save_shared_state(conversation_id, agency.shared_state.data)
 
         # --- Publish to Valkey AFTER successful commit ---
         # try:
@@ -545,7 +580,8 @@ async def chat_endpoint(
 async def get_messages_flexible(
     conversation_id: str,
     limit: int = Query(0, description="Maximum number of messages to retrieve, set to 0 for all messages"),
-    offset: int = Query(0, description="Number of messages to skip"),
+    offset: int = Query(0, description="Number of messages to skip (ignored when cursor is given)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; requires limit > 0"),
     order: str = Query("desc", description="Order of messages: 'asc' for oldest first, 'desc' for newest first"),
     token: str = Depends(get_token_header),
     db: Session = Depends(get_db)
@@ -566,14 +602,14 @@ async def get_messages_flexible(
 
     redis_conn = await get_valkey_connection()
     # Create a cache key that includes all query parameters that affect the result
-    cache_key = f"messages:{conversation_id}:limit_{limit}:offset_{offset}:order_{order.lower()}"
+    cache_key = f"messages:{conversation_id}:limit_{limit}:offset_{offset}:cursor_{cursor or ''}:order_{order.lower()}"
 
     if redis_conn:
         try:
             cached_data_json = await redis_conn.get(cache_key)
             if cached_data_json:
                 logger.info(f"Cache HIT for messages: {cache_key} by user {current_user.email}")
-                return json.loads(cached_data_json)
+                return orjson.loads(cached_data_json)
             else:
                 logger.info(f"Cache MISS for messages: {cache_key} by user {current_user.email}")
         except Exception as e:
@@ -607,16 +643,34 @@ async def get_messages_flexible(
             detail="Order must be 'asc' or 'desc'"
         )
     
-    # Get messages with the specified options
-    messages = message_repo.get_messages_flexible(
-        conversation_id=conversation_id,
-        limit=limit,
-        offset=offset,
-        ascending=(order.lower() == "asc")
-    )
-    
-    # Convert to DTOs
-    message_dtos = [message_repo.to_dto(message) for message in messages]
+    if cursor:
+        if limit <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A cursor requires limit > 0"
+            )
+        # Seek past the previous page instead of skipping offset rows; the total is the stored message_count
+        try:
+            message_dtos, next_cursor = message_repo.get_message_dtos_cursor(
+                conversation_id=conversation_id,
+                cursor=cursor,
+                limit=limit,
+                ascending=(order.lower() == "asc")
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        total_count = message_repo.count_for_conversation(conversation_id)
+        offset = 0
+    else:
+        # Get messages with the specified options, already converted to DTOs, and the total in the same query
+        message_dtos, total_count = message_repo.get_message_dtos_page(
+            conversation_id=conversation_id,
+            limit=limit,
+            offset=offset,
+            ascending=(order.lower() == "asc")
+        )
+        # A full page hands out a cursor so clients can switch to keyset paging from here on
+        next_cursor = message_repo.encode_cursor(message_dtos[-1]) if limit > 0 and len(message_dtos) == limit else None
 
     agency = AgencyService.initialize_agency(conversation_id, conversation_repo)
 
@@ -631,10 +685,11 @@ async def get_messages_flexible(
     return {
         "messages": message_dtos, 
         "conversation_id": conversation_id,
-        "total_count": message_repo.count_for_conversation(conversation_id),
+        "total_count": total_count,
         "order": order,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
         "generated_content": generated_content,
         "action": latest_action
     }
@@ -642,15 +697,16 @@ async def get_messages_flexible(
 @app.get("/conversations", tags=["Chat"])
 async def get_conversations_with_messages(
     limit: int = Query(20, description="Maximum number of conversations to retrieve"),
-    offset: int = Query(0, description="Number of conversations to skip"),
+    offset: int = Query(0, description="Number of conversations to skip (ignored when cursor is given)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     project_id: str = Query(None, description="Filter conversations by project ID"),
     token: str = Depends(get_token_header),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all conversations for the current user with their latest messages."""
     # Verify token and get current user
     try:
-        current_user = await get_current_user(token=token, db=db)
+        current_user = await get_current_user_async(token=token, db=db)
         logger.info(f"User {current_user.email} retrieving conversations")
     except HTTPException as e:
         raise HTTPException(
@@ -660,8 +716,7 @@ async def get_conversations_with_messages(
     
     # If project_id is provided, verify it exists and belongs to the user
     if project_id:
-        project_repo = ProjectRepository(db)
-        project = project_repo.get_by_id(project_id)
+        project = await db.get(ProjectModel, project_id)
         if not project:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -674,30 +729,28 @@ async def get_conversations_with_messages(
             )
     
     # Get conversations for user
-    conversation_repo = ConversationRepository(db)
-    message_repo = MessageRepository(db)
+    conversation_repo = AsyncConversationRepository(db)
+    
+    # A cursor seeks straight past the previous page; offset paging stays for existing clients
+    after = None
+    if cursor:
+        try:
+            after = conversation_repo.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        offset = 0
     
-    conversations = conversation_repo.get_for_user(
+    # Conversations and their latest messages come back from a single LATERAL join query, already as DTOs
+    result = await conversation_repo.list_dtos_for_user(
         email=current_user.email, 
         limit=limit, 
         offset=offset,
-        project_id=project_id
+        project_id=project_id,
+        after=after
     )
-    result = []
+    next_cursor = conversation_repo.encode_cursor(result[-1]) if limit > 0 and len(result) == limit else None
     
-    # For each conversation, get the latest message
-    for conversation in conversations:
-        conv_dto = conversation_repo.to_dto(conversation)
-        latest_messages = message_repo.get_for_conversation(conversation.id, limit=1, offset=0)
-        
-        # Add latest message preview if available
-        if latest_messages:
-            latest_message = message_repo.to_dto(latest_messages[0])
-            conv_dto.latest_message = latest_message
-        
-        result.append(conv_dto)
-    
-    return {"conversations": result}
+    return {"conversations": result, "next_cursor": next_cursor}
 
 @app.post("/conversations/{conversation_id}/toggle-pin", response_model=ConversationDto, tags=["Chat"])
 async def toggle_pin_endpoint(
@@ -736,12 +789,12 @@ async def get_conversation_details_endpoint(
 @app.get("/user/conversations", tags=["Chat"])
 async def get_user_conversations_endpoint(
     token: str = Depends(get_token_header),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all conversations belonging to the authenticated user with essential details."""
     # Verify token and get current user
     try:
-        current_user = await get_current_user(token=token, db=db)
+        current_user = await get_current_user_async(token=token, db=db)
         logger.info(f"User {current_user.email} requesting their conversations")
     except HTTPException as e:
         raise e
@@ -801,7 +854,8 @@ async def get_keywords(
             detail="Table ID not found"
         )
     agency.shared_state.set('action', None)
-    conversation_repo.save_shared_state(conversation_id, agency.shared_state.data)
+    # Only the action key changed; patch it instead of rewriting the whole shared_state document
+    conversation_repo.patch_shared_state(conversation_id, ['action'], None)
 
     return table_data
 
@@ -974,19 +1028,14 @@ async def get_conversations_for_project(
     
     # Get conversations for project
     conversation_repo = ConversationRepository(db)
-    conversations = conversation_repo.get_for_project(
+    conversations = conversation_repo.get_summaries_for_project(
         project_id=project_id,
         limit=limit,
         offset=offset
     )
     
     # Return conversation name, ID, is_pinned, and updated_at
-    result = [{
-        "id": conv.id, 
-        "name": conv.name, 
-        "is_pinned": conv.is_pinned,
-        "updated_at": conv.updated_at.isoformat() if conv.updated_at else None
-    } for conv in conversations]
+    result = [conv.to_response_dict() for conv in conversations]
     
     return {"conversations": result}
 
@@ -1166,7 +1215,7 @@ async def build_authorization_url(
     state_data = {
         "user_email": user_email,
         "service_name": service_name.value,
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": datetime.now(timezone.utc).isoformat()
     }
     
     # Store in your key-value store
@@ -1264,12 +1313,10 @@ async def list_ga4_account_summaries(
         raise HTTPException(status_code=e.status_code, detail=f"Authentication required: {e.detail}")
 
     analytics_service = AnalyticsService(db=db)
-    account_summaries = await analytics_service.list_account_summaries(user_email=current_user.email)
+    account_summaries, token_status = await analytics_service.list_account_summaries(user_email=current_user.email)
 
     if account_summaries is None:
-        oauth_service = GoogleOAuthService(db=db) 
-        token_exists = oauth_service.token_repo.get_token(current_user.email, GoogleServiceModel.GOOGLE_ANALYTICS_4)
-        if not token_exists:
+        if token_status == TokenStatus.MISSING:
              raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Google Analytics 4 not connected for this user. Please connect it first via the OAuth flow."
@@ -1438,17 +1485,15 @@ async def run_ga4_report_endpoint(
         # Convert Pydantic model to dict, excluding unset fields to send a clean request to Google
         request_body_dict = report_request.model_dump(exclude_none=True)
         
-        report_data = await analytics_service.run_ga4_report(
+        report_data, token_status = await analytics_service.run_ga4_report(
             user_email=current_user.email,
             property_id=property_id,
             report_request=request_body_dict
         )
 
         if report_data is None: # Should be handled by exceptions in service now
-            # Check if the token exists to differentiate
-            oauth_service = GoogleOAuthService(db=db)
-            token_exists = oauth_service.token_repo.get_token(current_user.email, GoogleServiceModel.GOOGLE_ANALYTICS_4)
-            if not token_exists:
+            # The service reports whether a token was stored at all, so no second lookup is needed
+            if token_status == TokenStatus.MISSING:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Google Analytics 4 not connected for this user. Please connect it first."
@@ -1,18 +1,22 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime, Text, Boolean, Integer, text, JSON, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, ForeignKey, DateTime, Text, Boolean, Integer, text, JSON, Index, DDL, event
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from database import Base
+from db_triggers import CURRENT_MESSAGE_TRIGGER_DDL
 import datetime
 import enum
 from sqlalchemy import Enum as SQLAlchemyEnum
 
 class User(Base):
     __tablename__ = "users"
+    # Server defaults (created_at, updated_at, email_verified) come back via RETURNING; no refresh() needed
+    __mapper_args__ = {"eager_defaults": True}
 
     email = Column(String, primary_key=True, index=True, unique=True)
     first_name = Column(String)
     last_name = Column(String)
-    password = Column(String)
+    password = deferred(Column(String))  # Only loaded when authenticating (see UserRepository.get_by_email_with_password)
     role = Column(String, default="user", nullable=False)
     token_limit = Column(Integer, nullable=True)  # Can be null for unlimited
     is_subscribed = Column(Boolean, default=False, nullable=False)
@@ -25,20 +29,16 @@ class User(Base):
     google_oauth_tokens = relationship("GoogleOAuthToken", back_populates="user", cascade="all, delete-orphan")
     created_at = Column(DateTime(timezone=True), server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), server_default=text("NOW()"), onupdate=text("NOW()"))
-    
-    # Create compound index for frequently searched fields
-    __table_args__ = (
-        Index('idx_user_name_email', 'first_name', 'last_name', 'email'),
-    )
 
 class Project(Base):
     __tablename__ = "projects"
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     website_url = Column(String, nullable=True)
     project_data = Column(JSON, nullable=True, default={})
-    user_email = Column(String, ForeignKey("users.email"), nullable=False, index=True)
+    user_email = Column(String, ForeignKey("users.email"), nullable=False)
     gsc_site_url = Column(String, nullable=True, index=True) # New field for GSC site URL
     created_at = Column(DateTime(timezone=True), server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), server_default=text("NOW()"), onupdate=text("NOW()"))
@@ -47,35 +47,41 @@ class Project(Base):
     user = relationship("User", back_populates="projects")
     conversations = relationship("Conversation", back_populates="project", cascade="all, delete-orphan")
     
-    # Index for better query performance
+    # Project names are unique per user; the index also serves every user_email lookup (left prefix)
     __table_args__ = (
-        Index('idx_project_user', 'user_email'),
+        Index('uq_project_user_name', 'user_email', 'name', unique=True),
     )
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    # Fetch server-generated updated_at via RETURNING on UPDATE too, so callers never need refresh()
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(String, primary_key=True, index=True)
     name = Column(String)
     # Foreign keys
     user_email = Column(String, ForeignKey("users.email"), nullable=False, index=True)
     project_id = Column(String, ForeignKey("projects.id"), nullable=True, index=True)  # Changed back to nullable=True
-    # New JSON fields for state storage
-    shared_state = Column(JSON, nullable=True, default={})
-    threads = Column(JSON, nullable=True, default={})
-    settings = Column(JSON, nullable=True, default=[])  # Stores a list of assistant settings
-    is_pinned = Column(Boolean, default=False)  # New column for pinned status
+    # New JSON fields for state storage; deferred as one group so list queries don't ship the blobs
+    shared_state = deferred(Column(JSONB, nullable=True, default={}, server_default=text("'{}'::jsonb")), group="state")
+    threads = deferred(Column(JSONB, nullable=True, default={}, server_default=text("'{}'::jsonb")), group="state")
+    settings = deferred(Column(JSONB, nullable=True, default=[], server_default=text("'[]'::jsonb")), group="state")  # Stores a list of assistant settings
+    is_pinned = Column(Boolean, default=False, server_default=text("false"), nullable=False)  # New column for pinned status
+    # Maintained by the messages insert/delete triggers (migration c8e2a5f17d46, and the DDL attached
+    # to the messages table for create_all); never written by the app
+    message_count = Column(Integer, nullable=False, server_default=text("0"))
     # Relationships
     user = relationship("User", back_populates="conversations")
     project = relationship("Project", back_populates="conversations")
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    # passive_deletes: the FK's ON DELETE CASCADE removes messages; the ORM never loads them to delete them
+    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", passive_deletes=True)
     created_at = Column(DateTime(timezone=True), server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), server_default=text("NOW()"), onupdate=text("NOW()"))
     
-    # Add index to improve query performance on frequently filtered fields
+    # List/keyset access paths: pinned first, newest first, id as the unique tie-breaker
     __table_args__ = (
-        Index('idx_conv_user_updated', 'user_email', 'updated_at'),
-        Index('idx_conv_project', 'project_id'),
+        Index('ix_conv_user_pinned_updated_id', user_email, is_pinned.desc(), updated_at.desc(), id.desc()),
+        Index('ix_conv_project_pinned_updated_id', project_id, is_pinned.desc(), updated_at.desc(), id.desc()),
     )
 
 class Message(Base):
@@ -85,19 +91,31 @@ class Message(Base):
     content = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     is_from_agency = Column(Boolean, default=False)
-    conversation_id = Column(String, ForeignKey("conversations.id"), index=True)
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), index=True)
     sender_email = Column(String, ForeignKey("users.email"), nullable=True, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Messages are immutable and `timestamp` records creation, so there are no created_at/updated_at columns
+    # Inserts bump conversations.updated_at/message_count and projects.updated_at via the
+    # messages_touch_conversation trigger (migrations b3f9c6d2e071, c8e2a5f17d46, and the DDL
+    # below for create_all), so writers never issue those UPDATEs themselves
     
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", back_populates="messages")
     
-    # Add compound index for message filtering and sorting
+    # Latest-first index matching the "newest N messages" keyset sort (timestamp, id);
+    # INCLUDE columns allow index-only scans
     __table_args__ = (
-        Index('idx_message_conv_timestamp', 'conversation_id', 'timestamp'),
+        Index(
+            'idx_message_conv_ts_id_desc', 'conversation_id', timestamp.desc(), id.desc(),
+            postgresql_include=['is_from_agency', 'sender_email'],
+        ),
     )
 
+# main.py builds the schema with create_all, which does not run migrations: attach the message
+# triggers to the table too, so a create_all database keeps updated_at and message_count
+# current. The SQL is the same constants the migrations install (db_triggers.py)
+for _sql in CURRENT_MESSAGE_TRIGGER_DDL:
+    event.listen(Message.__table__, "after_create", DDL(_sql).execute_if(dialect="postgresql"))
+
 class GoogleService(enum.Enum):
     SEARCH_CONSOLE = "search_console"
     GOOGLE_ANALYTICS_4 = "ga4"
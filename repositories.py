@@ -1,18 +1,21 @@
-from typing import List, Optional, Dict, Any, Type, TypeVar, Generic
-from sqlalchemy.orm import Session, load_only
-from sqlalchemy import and_, or_, desc, select, asc
+from typing import Iterable, List, Optional, Dict, Any, Tuple, Type, TypeVar, Generic, Union
+from sqlalchemy.orm import Session, aliased, raiseload, undefer, undefer_group
+from sqlalchemy import and_, or_, not_, true, desc, select, update, asc, bindparam, any_, String, tuple_, delete, text, literal, Text, inspect as sa_inspect
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert, ARRAY, JSONB
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 import datetime
 import uuid
-import pickle
+from itertools import islice
 import logging
 
+from database import commit_or_flush
 from models import User, Conversation, Message, Project, GoogleOAuthToken, GoogleService
+from utils.pagination import encode_cursor, decode_cursor, parse_cursor_timestamp
 from dto import (
     UserDto, CreateUserDto, 
-    ConversationDto, CreateConversationDto,
+    ConversationDto, ConversationSummaryDto, CreateConversationDto,
     MessageDto, SendMessageDto,
     ProjectDto, CreateProjectDto,
     UpdateProjectDto,
@@ -22,49 +25,176 @@ T = TypeVar('T')
 
 logger = logging.getLogger(__name__)
 
+def _any_of(column, values: List[str]):
+    """`column = ANY(:values)`: a single array parameter, so statement size doesn't grow with the ID list."""
+    return column == any_(bindparam(None, list(values), type_=ARRAY(String)))
+
+def _touching_project(conversation_update):
+    """
+    Turns an `UPDATE conversations ... RETURNING project_id, ...` into a CTE paired with the
+    project updated_at bump, so both run as part of one statement:
+    
+        WITH touched_conversation AS (UPDATE conversations ... RETURNING ...),
+             touched_project AS (UPDATE projects SET updated_at = now() FROM touched_conversation ...)
+        SELECT / INSERT ...
+    """
+    touched_conversation = conversation_update.cte("touched_conversation")
+    touched_project = (
+        update(Project)
+        .where(Project.id == touched_conversation.c.project_id)
+        .values(updated_at=func.now())
+        .cte("touched_project")
+    )
+    return touched_conversation, touched_project
+
+def _expire_if_loaded(db: Session, model, id_value, attribute_names: List[str]):
+    """Statements run through CTEs bypass ORM synchronization; expire a loaded copy so it reloads on access."""
+    instance = db.identity_map.get(db.identity_key(model, id_value))
+    if instance is not None:
+        db.expire(instance, attribute_names)
+
+# List queries hand many instances to callers; touching a relationship on one raises instead of
+# silently issuing a lazy SELECT per row (N+1). Load what a caller needs explicitly.
+_NO_LAZY_LOADS = raiseload("*")
+
+# Fixed-shape statements built once at import so hot paths skip statement construction;
+# their cache keys are stable, so each call reuses the compiled SQL from the engine's cache
+# message_count is kept current by the messages triggers: a primary-key lookup instead of counting rows
+_COUNT_MESSAGES_STMT = select(Conversation.message_count).where(Conversation.id == bindparam("conversation_id"))
+_USER_WITH_PASSWORD_BY_EMAIL_STMT = select(User).where(User.email == bindparam("email")).options(undefer(User.password))
+_LOAD_THREADS_STMT = select(Conversation.threads).where(Conversation.id == bindparam("conversation_id"))
+_LOAD_SETTINGS_STMT = select(Conversation.settings).where(Conversation.id == bindparam("conversation_id"))
+_LOAD_SHARED_STATE_STMT = select(Conversation.shared_state).where(Conversation.id == bindparam("conversation_id"))
+_MESSAGES_NEWEST_FIRST_STMT = (
+    select(Message)
+    .where(Message.conversation_id == bindparam("conversation_id"))
+    .order_by(desc(Message.timestamp), desc(Message.id))
+    .limit(bindparam("limit"))
+    .options(_NO_LAZY_LOADS)
+)
+_MESSAGES_BEFORE_STMT = (
+    select(Message)
+    .where(
+        Message.conversation_id == bindparam("conversation_id"),
+        tuple_(Message.timestamp, Message.id) < tuple_(bindparam("before_ts"), bindparam("before_id")),
+    )
+    .order_by(desc(Message.timestamp), desc(Message.id))
+    .limit(bindparam("limit"))
+    .options(_NO_LAZY_LOADS)
+)
+
+def _save_state_stmt(field: str):
+    """Whole-document write of one JSON state column, with the conversation/project timestamp bump."""
+    touched_conversation, touched_project = _touching_project(
+        update(Conversation)
+        .where(Conversation.id == bindparam("conversation_id"))
+        .values({field: bindparam("value"), "updated_at": func.now()})
+        .returning(Conversation.id, Conversation.project_id)
+    )
+    return select(touched_conversation.c.id).add_cte(touched_project)
+
+_SAVE_STATE_STMTS = {field: _save_state_stmt(field) for field in ("threads", "settings", "shared_state")}
+# Conversation columns loaded by default (the deferred "state" group excluded), for UPDATE ... RETURNING
+_CONVERSATION_ROW_COLS = tuple(
+    sa_inspect(Conversation).columns[attr.key] for attr in sa_inspect(Conversation).column_attrs if not attr.deferred
+)
+_CONVERSATION_DEFERRED_KEYS = frozenset(attr.key for attr in sa_inspect(Conversation).column_attrs if attr.deferred)
+# Rows per bulk_create_messages statement: 4 columns x 1000 rows stays far below PostgreSQL's 65535 bind parameters
+_BULK_INSERT_BATCH = 1000
+# Table-level insert: rows are plain tuples, not ORM instances; RETURNING rows come back in parameter order
+_BULK_INSERT_MESSAGES_STMT = insert(Message.__table__).returning(
+    Message.id, Message.timestamp, sort_by_parameter_order=True
+)
+# Columns the messages triggers change on the parent conversation
+_MESSAGE_TRIGGER_ATTRS = ["updated_at", "message_count"]
+_TOKEN_BY_USER_SERVICE_STMT = select(GoogleOAuthToken).where(
+    GoogleOAuthToken.user_email == bindparam("user_email"),
+    GoogleOAuthToken.service_name == bindparam("service_name"),
+)
+
+def _conversation_keyset(query, after: Optional[Tuple[bool, datetime.datetime, str]], ascending: bool):
+    """Applies the (is_pinned, updated_at, id) keyset order, and the seek past `after` when given, to a conversation query."""
+    if after is not None:
+        after_pinned, after_updated_at, after_id = after
+        if ascending:
+            # Mixed sort directions cannot be expressed as a single row-value comparison
+            query = query.where(or_(
+                Conversation.is_pinned < after_pinned,
+                and_(
+                    Conversation.is_pinned == after_pinned,
+                    tuple_(Conversation.updated_at, Conversation.id) > tuple_(after_updated_at, after_id),
+                ),
+            ))
+        else:
+            # Seeks directly into ix_conv_user_pinned_updated_id
+            query = query.where(
+                tuple_(Conversation.is_pinned, Conversation.updated_at, Conversation.id)
+                < tuple_(after_pinned, after_updated_at, after_id)
+            )
+    
+    if ascending:
+        return query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.asc(), Conversation.id.asc())
+    return query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.desc(), Conversation.id.desc())
+
 class BaseRepository(Generic[T]):
     """Base repository with common CRUD operations."""
     
     def __init__(self, db: Session, model: Type[T]):
         self.db = db
         self.model = model
+        mapper = sa_inspect(model)
+        # Column attribute names, computed once so update() can filter DTO keys with a set intersection
+        self._mapped_cols = frozenset(attr.key for attr in mapper.column_attrs)
+        self._pk_col = mapper.primary_key[0]
+        # ORM-level delete cascades (e.g. User -> conversations) must go through session.delete()
+        self._has_orm_delete_cascade = any(
+            rel.cascade.delete and not rel.passive_deletes for rel in mapper.relationships
+        )
     
     def get_by_id(self, id_value):
-        """Get entity by ID."""
-        return self.db.query(self.model).get(id_value)
+        """Get entity by ID. Served from the session's identity map when the entity is already loaded."""
+        return self.db.get(self.model, id_value)
     
     def get_all(self):
         """Get all entities."""
-        return self.db.query(self.model).all()
+        return self.db.scalars(select(self.model)).all()
     
     def create(self, dto_dict):
-        """Create entity from DTO dictionary."""
-        entity = self.model(**dto_dict)
-        self.db.add(entity)
-        self.db.commit()
-        self.db.refresh(entity)
+        """Create entity from DTO dictionary with one INSERT ... RETURNING, so server defaults need no reload."""
+        entity = self.db.scalar(insert(self.model).values(**dto_dict).returning(self.model))
+        commit_or_flush(self.db)
         return entity
     
     def update(self, id_value, dto_dict):
-        """Update entity with values from DTO dictionary."""
-        entity = self.get_by_id(id_value)
-        if not entity:
-            return None
-        
-        for key, value in dto_dict.items():
-            if hasattr(entity, key):
-                setattr(entity, key, value)
-        
-        self.db.commit()
-        self.db.refresh(entity)
+        """
+        Update entity with values from DTO dictionary in one UPDATE ... RETURNING (no SELECT first).
+        A copy already in the session is refreshed from the returned row. Returns None if not found.
+        """
+        values = {key: dto_dict[key] for key in dto_dict.keys() & self._mapped_cols}
+        if not values:
+            return self.get_by_id(id_value)
+        entity = self.db.scalar(
+            update(self.model)
+            .where(self._pk_col == id_value)
+            .values(values)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        commit_or_flush(self.db)
         return entity
     
     def delete(self, id_value):
         """Delete entity by ID."""
+        if not self._has_orm_delete_cascade:
+            # Single DELETE ... WHERE pk = :id; no SELECT to hydrate a row that is about to go away
+            result = self.db.execute(delete(self.model).where(self._pk_col == id_value))
+            commit_or_flush(self.db)
+            return result.rowcount > 0
+        
         entity = self.get_by_id(id_value)
         if entity:
             self.db.delete(entity)
-            self.db.commit()
+            commit_or_flush(self.db)
             return True
         return False
 
@@ -75,8 +205,20 @@ class UserRepository(BaseRepository[User]):
         super().__init__(db, User)
     
     def get_by_email(self, email: str) -> Optional[User]:
-        """Get user by email."""
-        return self.db.query(User).filter(User.email == email).first()
+        """Get user by email (the primary key). Repeat lookups within a session are identity-map hits with no SQL."""
+        return self.db.get(User, email)
+    
+    def get_by_email_with_password(self, email: str) -> Optional[User]:
+        """Get user by email with the (deferred) password hash loaded, for credential checks."""
+        return self.db.execute(_USER_WITH_PASSWORD_BY_EMAIL_STMT, {"email": email}).scalar_one_or_none()
+    
+    def list_dtos(self, skip: int = 0, limit: int = 50) -> List[UserDto]:
+        """Get a page of users as UserDtos built directly from the selected columns."""
+        query = select(User.email, User.first_name, User.last_name).order_by(User.email).offset(skip).limit(limit)
+        return [
+            UserDto.model_construct(email=row.email, first_name=row.first_name, last_name=row.last_name)
+            for row in self.db.execute(query)
+        ]
     
     def create_from_dto(self, user_data: CreateUserDto, hashed_password: str) -> User:
         """Creates a User from CreateUserDto."""
@@ -90,8 +232,8 @@ class UserRepository(BaseRepository[User]):
         return db_user
     
     def to_dto(self, user: User) -> UserDto:
-        """Convert User model to UserDto."""
-        return UserDto(
+        """Convert User model to UserDto. Values come from the database, so pydantic validation is skipped."""
+        return UserDto.model_construct(
             email=user.email,
             first_name=user.first_name,
             last_name=user.last_name
@@ -103,13 +245,9 @@ class ProjectRepository(BaseRepository[Project]):
     def __init__(self, db_session: Session):
         super().__init__(db_session, Project)
     
-    def get_by_id(self, project_id: str) -> Optional[Project]:
-        """Get project by ID."""
-        return self.db.query(Project).filter(Project.id == project_id).first()
-    
     def get_for_user(self, email: str) -> List[Project]:
         """Get all projects for a specific user."""
-        return self.db.query(Project).filter(Project.user_email == email).all()
+        return self.db.scalars(select(Project).where(Project.user_email == email)).all()
     
     def create_from_dto(self, create_project_dto: CreateProjectDto, user_email: str) -> Project:
         """Create a new project from DTO, generating a UUID for id."""
@@ -120,8 +258,8 @@ class ProjectRepository(BaseRepository[Project]):
         return super().create(project_data)
     
     def to_dto(self, project: Project) -> ProjectDto:
-        """Convert Project model to ProjectDto."""
-        return ProjectDto(
+        """Convert Project model to ProjectDto. Values come from the database, so pydantic validation is skipped."""
+        return ProjectDto.model_construct(
             id=project.id,
             name=project.name,
             website_url=project.website_url,
@@ -137,20 +275,37 @@ class ProjectRepository(BaseRepository[Project]):
             return None
             
         project.project_data = project_data
-        self.db.commit()
-        self.db.refresh(project)
+        commit_or_flush(self.db)
         return project
 
     def get_by_name_and_user(self, name: str, user_email: str) -> Optional[Project]:
         """Get project by name and user email."""
-        return self.db.query(Project).filter(
+        # uq_project_user_name makes this at most one row
+        return self.db.scalars(select(Project).where(
             Project.name == name,
             Project.user_email == user_email
-        ).first()
+        )).one_or_none()
+    
+    @staticmethod
+    def is_duplicate_name(error: IntegrityError) -> bool:
+        """True if `error` is the uq_project_user_name violation, not some other integrity failure (e.g. a foreign key)."""
+        diag = getattr(error.orig, "diag", None)
+        return getattr(diag, "constraint_name", None) == "uq_project_user_name"
     
     def get_by_user_email(self, user_email: str) -> List[Project]:
         """Get all projects for a specific user."""
-        return self.db.query(Project).filter(Project.user_email == user_email).all()
+        return self.db.scalars(select(Project).where(Project.user_email == user_email)).all()
+    
+    def list_dtos_for_user(self, user_email: str) -> List[ProjectDto]:
+        """
+        Get all projects for a user as ProjectDtos built straight from the selected columns:
+        no ORM instances, no instrumented attribute access, no pydantic validation.
+        """
+        query = select(
+            Project.id, Project.name, Project.website_url, Project.project_data,
+            Project.user_email, Project.gsc_site_url
+        ).where(Project.user_email == user_email)
+        return [ProjectDto.model_construct(**row._mapping) for row in self.db.execute(query)]
 
     def delete(self, project: Project) -> bool:
         """Deletes a given project instance."""
@@ -218,88 +373,44 @@ class ConversationRepository(BaseRepository[Conversation]):
     def __init__(self, db: Session):
         super().__init__(db, Conversation)
     
-    def get_by_id(self, conversation_id: str) -> Optional[Conversation]:
-        """Get conversation by ID."""
-        return self.db.query(Conversation).filter(Conversation.id == conversation_id).first()
-    
-    def get_for_user(self, email: str, limit: int = 50, offset: int = 0, ascending: bool = False, project_id: Optional[str] = None) -> List[Conversation]:
+    def get_by_id(self, conversation_id: str, include_state: bool = False) -> Optional[Conversation]:
         """
-        Get conversations owned by a user with pagination.
-        
-        Args:
-            email: The user's email
-            limit: Maximum number of conversations (0 for all)
-            offset: Number of conversations to skip
-            ascending: If True, order by updated_at ascending (oldest first), 
-                      otherwise descending (newest first)
-            project_id: Optional filter for conversations belonging to a specific project
-        
-        Returns:
-            List of conversations, with pinned conversations first, then sorted by updated_at
+        Get conversation by ID, from the identity map when already loaded.
+        The JSON state columns are only loaded when include_state is set.
         """
-        # Base query for user's conversations
-        query = self.db.query(Conversation).filter(
-            Conversation.user_email == email
-        )
-        
-        # Filter by project if specified
-        if project_id:
-            query = query.filter(Conversation.project_id == project_id)
-        
-        # Sort by is_pinned (True first) and then by updated_at
-        if ascending:
-            query = query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.asc())
-        else:
-            query = query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.desc())
-        
-        # Apply offset if specified
-        if offset > 0:
-            query = query.offset(offset)
-        
-        # Apply limit if specified (non-zero)
-        if limit > 0:
-            query = query.limit(limit)
-            
-        return query.all()
+        return self.db.get(Conversation, conversation_id, options=[undefer_group("state")] if include_state else None)
     
-    def get_for_project(self, project_id: str, limit: int = 50, offset: int = 0, ascending: bool = False) -> List[Conversation]:
+    def get_summaries_for_project(self, project_id: str, limit: int = 50, offset: int = 0, ascending: bool = False) -> List[ConversationSummaryDto]:
         """
-        Get conversations for a specific project with pagination.
-        
-        Args:
-            project_id: The project ID
-            limit: Maximum number of conversations (0 for all)
-            offset: Number of conversations to skip
-            ascending: If True, order by updated_at ascending (oldest first), 
-                      otherwise descending (newest first)
+        Get ConversationSummaryDtos (id, name, updated_at, is_pinned) for a project's conversations.
         
-        Returns:
-            List of conversations, with pinned conversations first, then sorted by updated_at
+        Pinned conversations first, then by updated_at; selects only the listed columns so no
+        ORM entities are materialized.
         """
-        # Base query for project's conversations
-        query = self.db.query(Conversation).filter(
-            Conversation.project_id == project_id
-        )
+        query = select(
+            Conversation.id, Conversation.name, Conversation.updated_at, Conversation.is_pinned
+        ).where(Conversation.project_id == project_id)
         
-        # Sort by is_pinned (True first) and then by updated_at
         if ascending:
             query = query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.asc())
         else:
             query = query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.desc())
         
-        # Apply offset if specified
         if offset > 0:
             query = query.offset(offset)
-        
-        # Apply limit if specified (non-zero)
         if limit > 0:
             query = query.limit(limit)
-            
-        return query.all()
+        
+        return [self._summary_dto(row) for row in self.db.execute(query)]
+    
+    @staticmethod
+    def _summary_dto(row) -> ConversationSummaryDto:
+        """Builds a ConversationSummaryDto from a summary row; values come from the database, so validation is skipped."""
+        return ConversationSummaryDto.model_construct(**row._mapping)
     
-    def get_for_project_raw(self, project_id: str) -> List[Conversation]:
-        """Get all raw Conversation model instances for a specific project."""
-        return self.db.query(Conversation).filter(Conversation.project_id == project_id).all()
+    def get_ids_for_project(self, project_id: str) -> List[str]:
+        """Get the IDs of all conversations in a project."""
+        return self.db.scalars(select(Conversation.id).where(Conversation.project_id == project_id)).all()
     
     def create_from_dto(self, dto: CreateConversationDto, creator_email: str) -> Conversation:
         """Create a new conversation from DTO."""
@@ -309,22 +420,21 @@ class ConversationRepository(BaseRepository[Conversation]):
         # Convert to DB dict
         db_dict = dto.to_db_dict(creator_email)
         
-        # Create conversation
-        db_conversation = Conversation(
-            id=conversation_id,
-            **db_dict
+        # Create conversation; server defaults (timestamps, message_count) and the JSON state come back
+        # from RETURNING, so to_dto needs no follow-up SELECT of the deferred columns
+        db_conversation = self.db.scalar(
+            insert(Conversation).values(id=conversation_id, **db_dict).returning(Conversation)
+            .options(undefer_group("state"))
         )
-        self.db.add(db_conversation)
         
         # Commit changes
-        self.db.commit()
-        self.db.refresh(db_conversation)
+        commit_or_flush(self.db)
         
         return db_conversation
     
     def to_dto(self, conversation: Conversation) -> ConversationDto:
-        """Convert Conversation model to ConversationDto."""
-        return ConversationDto(
+        """Convert Conversation model to ConversationDto. Values come from the database, so pydantic validation is skipped."""
+        return ConversationDto.model_construct(
             id=conversation.id,
             name=conversation.name,
             user_email=conversation.user_email,
@@ -337,117 +447,173 @@ class ConversationRepository(BaseRepository[Conversation]):
             updated_at=conversation.updated_at
         )
     
-    def _update_project_timestamp(self, conversation_id: str):
-        """Helper method to update the project's updated_at timestamp when a conversation is updated."""
-        conversation = self.get_by_id(conversation_id)
-        if conversation and conversation.project_id:
-            self.db.query(Project).filter(Project.id == conversation.project_id).update(
-                {Project.updated_at: func.now()}
-            )
-            self.db.commit()
+    def _update_and_touch_project(self, conversation_id: str, values: Dict[str, Any]) -> bool:
+        """
+        Applies `values` to a conversation and bumps its project's updated_at in one statement.
+        Commits once. Returns False when the conversation does not exist.
+        """
+        values = {**values, "updated_at": func.now()}
+        touched_conversation, touched_project = _touching_project(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(values)
+            .returning(Conversation.id, Conversation.project_id)
+        )
+        stmt = select(touched_conversation.c.id).add_cte(touched_project)
+        return self._execute_touching(stmt, {}, conversation_id, list(values))
 
-    def update(self, id_value, dto_dict):
-        """Update entity with values from DTO dictionary."""
-        entity = self.get_by_id(id_value)
-        if not entity:
-            return None
-        
-        for key, value in dto_dict.items():
-            if hasattr(entity, key):
-                setattr(entity, key, value)
+    def _save_state(self, conversation_id: str, field: str, value: Any) -> bool:
+        """Whole-document write of one JSON state column through its prebuilt statement."""
+        params = {"conversation_id": conversation_id, "value": value}
+        return self._execute_touching(_SAVE_STATE_STMTS[field], params, conversation_id, [field, "updated_at"])
+
+    def _execute_touching(self, stmt, params: Dict[str, Any], conversation_id: str, attribute_names: List[str]) -> bool:
+        updated_id = self.db.scalar(stmt, params)
+        commit_or_flush(self.db)
+        _expire_if_loaded(self.db, Conversation, conversation_id, attribute_names)
+        return updated_id is not None
+
+    def update(self, id_value, dto_dict, returning_state: bool = False):
+        """
+        Update entity with values from DTO dictionary in one UPDATE ... RETURNING (no SELECT first).
+        Pass returning_state when the result goes through to_dto (see _update_returning).
+        """
+        values = {key: dto_dict[key] for key in dto_dict.keys() & self._mapped_cols}
+        values["updated_at"] = func.now()
+        return self._update_returning(id_value, values, returning_state=returning_state)
+    
+    def _update_returning(self, conversation_id: str, values: Dict[str, Any], returning_state: bool = False) -> Optional[Conversation]:
+        """
+        Applies `values` with the project bump as one statement and maps the returned row back to the
+        session's Conversation (populate_existing refreshes a copy that is already loaded). Commits once.
+        Returns None when the conversation does not exist.
         
-        self.db.commit()
-        self.db.refresh(entity)
-        self._update_project_timestamp(id_value)
-        return entity
+        The deferred JSON state columns are only in RETURNING with returning_state; without it, reading
+        them afterwards (e.g. in to_dto) costs a second SELECT.
+        """
+        touched_conversation, touched_project = _touching_project(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(values)
+            .returning(*(Conversation.__table__.columns if returning_state else _CONVERSATION_ROW_COLS))
+        )
+        stmt = (
+            select(aliased(Conversation, touched_conversation))
+            .add_cte(touched_project)
+            .execution_options(populate_existing=True)
+        )
+        if returning_state:
+            stmt = stmt.options(undefer_group("state"))
+        conversation = self.db.scalar(stmt)
+        commit_or_flush(self.db)
+        # Deferred JSON columns not in RETURNING; expire any that were written
+        written_state = [key for key in values if key in _CONVERSATION_DEFERRED_KEYS]
+        if written_state and not returning_state:
+            _expire_if_loaded(self.db, Conversation, conversation_id, written_state)
+        return conversation
     
     def load_threads(self, conversation_id: str) -> Optional[dict]:
         """Load only the 'threads' field of a conversation."""
-        stmt = select(Conversation.threads).filter(Conversation.id == conversation_id)
-        result = self.db.execute(stmt).scalar_one_or_none()
-        return result
+        return self.db.execute(_LOAD_THREADS_STMT, {"conversation_id": conversation_id}).scalar_one_or_none()
 
     def save_threads(self, conversation_id: str, threads: dict):
         """Save only the 'threads' field of a conversation."""
-        self.db.query(Conversation).filter(Conversation.id == conversation_id).update({Conversation.threads: threads, Conversation.updated_at: func.now()})
-        self.db.commit()
-        self._update_project_timestamp(conversation_id)
+        self._save_state(conversation_id, "threads", threads)
+
+    def merge_threads(self, conversation_id: str, changed: dict):
+        """
+        Merge changed top-level keys into the 'threads' field (threads || :changed) in one statement.
+        Keys not in `changed` are left as stored; removing a key needs save_threads.
+        """
+        self._update_and_touch_project(conversation_id, {"threads": self._jsonb_merge(Conversation.threads, changed)})
+
+    def patch_shared_state(self, conversation_id: str, path: List[str], value: Any):
+        """
+        Set one key of the 'shared_state' field in place, e.g. patch_shared_state(cid, ["action"], None).
+        
+        Runs jsonb_set(shared_state, path, value) in the database, so only the changed subtree is sent
+        instead of the whole JSON document; missing leaf keys are created. Use save_shared_state to
+        replace the whole document.
+        """
+        self._update_and_touch_project(
+            conversation_id, {"shared_state": self._jsonb_set(Conversation.shared_state, path, value)}
+        )
+
+    def merge_shared_state(self, conversation_id: str, changed: dict):
+        """
+        Merge changed top-level keys into the 'shared_state' field in one statement.
+        Same shared_state || :changed write as merge_threads.
+        """
+        self._update_and_touch_project(
+            conversation_id, {"shared_state": self._jsonb_merge(Conversation.shared_state, changed)}
+        )
+
+    @staticmethod
+    def _jsonb_merge(column, changed: dict):
+        """coalesce(column, '{}') || :changed as an UPDATE value expression."""
+        return func.coalesce(column, text("'{}'::jsonb")).op("||")(literal(changed, JSONB))
+
+    @staticmethod
+    def _jsonb_set(column, path: List[str], value: Any):
+        """jsonb_set(coalesce(column, '{}'), path, value, create_missing => true) as an UPDATE value expression."""
+        return func.jsonb_set(
+            func.coalesce(column, text("'{}'::jsonb")),
+            literal(path, ARRAY(Text)),
+            # A SQL NULL here would make jsonb_set return NULL and wipe the whole document; store JSON null
+            literal(value, JSONB) if value is not None else text("'null'::jsonb"),
+            True
+        )
 
     def load_settings(self, conversation_id: str) -> Optional[list]: # Assuming settings is a list
         """Load only the 'settings' field of a conversation."""
-        stmt = select(Conversation.settings).filter(Conversation.id == conversation_id)
-        result = self.db.execute(stmt).scalar_one_or_none()
-        return result
+        return self.db.execute(_LOAD_SETTINGS_STMT, {"conversation_id": conversation_id}).scalar_one_or_none()
 
     def save_settings(self, conversation_id: str, settings: list):
         """Save only the 'settings' field of a conversation."""
-        self.db.query(Conversation).filter(Conversation.id == conversation_id).update({Conversation.settings: settings, Conversation.updated_at: func.now()})
-        self.db.commit()
-        self._update_project_timestamp(conversation_id)
+        self._save_state(conversation_id, "settings", settings)
 
     def load_shared_state(self, conversation_id: str) -> Optional[dict]:
         """Load only the 'shared_state' field of a conversation."""
-        stmt = select(Conversation.shared_state).filter(Conversation.id == conversation_id)
-        result = self.db.execute(stmt).scalar_one_or_none()
-        return result
+        return self.db.execute(_LOAD_SHARED_STATE_STMT, {"conversation_id": conversation_id}).scalar_one_or_none()
 
     def save_shared_state(self, conversation_id: str, shared_state: dict):
         """Save only the 'shared_state' field of a conversation."""
-        self.db.query(Conversation).filter(Conversation.id == conversation_id).update({Conversation.shared_state: shared_state, Conversation.updated_at: func.now()})
-        self.db.commit()
-        self._update_project_timestamp(conversation_id)
+        self._save_state(conversation_id, "shared_state", shared_state)
 
     def update_conversation(self, conversation_id: str) -> Optional[Conversation]:
         """Manually update the `updated_at` timestamp for a conversation."""
-        updated = self.db.query(Conversation).filter(
-            Conversation.id == conversation_id
-        ).update(
-            {Conversation.updated_at: func.now()}
-        )
-        if updated:
-            self.db.commit()
-            self._update_project_timestamp(conversation_id)
-            return self.get_by_id(conversation_id)
-        return None
-
-    def delete_conversation(self, conversation_id: str) -> bool:
-        """Deletes a single conversation by ID."""
-        conversation = self.get_by_id(conversation_id)
-        if conversation:
-            self.db.delete(conversation)
-            # Commit is handled by service/endpoint context manager
-            return True
-        return False
-    
+        return self._update_returning(conversation_id, {"updated_at": func.now()})
+
     def delete_conversations_by_ids(self, conversation_ids: List[str]) -> int:
         """Deletes multiple conversations based on a list of IDs."""
         if not conversation_ids:
             return 0
         try:
-            num_deleted = self.db.query(Conversation).filter(Conversation.id.in_(conversation_ids)).delete(synchronize_session=False)
+            num_deleted = self.db.execute(
+                delete(Conversation).where(_any_of(Conversation.id, conversation_ids)),
+                execution_options={"synchronize_session": False}
+            ).rowcount
             # Let the service layer handle commit/rollback
             # self.db.commit()
-            logger.info(f"Marked {num_deleted} conversations for deletion: {conversation_ids}")
+            logger.info(f"Marked {num_deleted} conversations for deletion ({len(conversation_ids)} IDs requested)")
             return num_deleted
         except SQLAlchemyError as e:
             # self.db.rollback()
             logger.error(f"Error deleting conversations {conversation_ids}: {e}", exc_info=True)
             raise # Re-raise the exception
 
-    def toggle_pin(self, conversation_id: str) -> Optional[Conversation]:
-        """Toggle the pinned status of a conversation."""
-        conversation = self.get_by_id(conversation_id)
-        if not conversation:
-            return None
+    def toggle_pin(self, conversation_id: str, returning_state: bool = False) -> Optional[Conversation]:
+        """
+        Toggle the pinned status of a conversation.
         
-        # Toggle the is_pinned status and update timestamp
-        self.db.query(Conversation).filter(Conversation.id == conversation_id).update({
-            Conversation.is_pinned: not conversation.is_pinned,
-            Conversation.updated_at: func.now()
-        })
-        self.db.commit()
-        self._update_project_timestamp(conversation_id)
-        return self.get_by_id(conversation_id)
+        The flip happens in the database (SET is_pinned = NOT is_pinned), so concurrent toggles
+        cannot both read the same value; the project bump rides along in the same statement.
+        Pass returning_state when the result goes through to_dto.
+        """
+        return self._update_returning(
+            conversation_id, {"is_pinned": not_(Conversation.is_pinned), "updated_at": func.now()},
+            returning_state=returning_state
+        )
 
     def get_project_by_conversation_id(self, conversation_id: str) -> Optional[Project]:
         """Get the project associated with a conversation."""
@@ -458,53 +624,240 @@ class ConversationRepository(BaseRepository[Conversation]):
         project_repo = ProjectRepository(self.db)
         return project_repo.get_by_id(conversation.project_id)
 
+class AsyncConversationRepository:
+    """
+    Conversation list queries for DB-only handlers on an AsyncSession (database.get_async_db), so
+    they await the database instead of blocking the event loop. Handlers that run the agency stay
+    on ConversationRepository: agency_swarm's callbacks are synchronous.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def list_dtos_for_user(self, email: str, limit: int = 50, offset: int = 0, ascending: bool = False, project_id: Optional[str] = None, after: Optional[Tuple[bool, datetime.datetime, str]] = None) -> List[ConversationDto]:
+        """
+        A user's conversations as ConversationDtos, pinned first, each with its latest message.
+        
+        The latest message comes from a LEFT JOIN LATERAL (... ORDER BY timestamp DESC, id DESC LIMIT 1),
+        one index seek on idx_message_conv_ts_id_desc per returned conversation. Selects plain columns
+        rather than entities, so no instances enter the identity map and DTOs are built from row
+        tuples without instrumented attribute access. Pass `after` (see decode_cursor) to seek past
+        the previous page instead of skipping `offset` rows.
+        """
+        latest = (
+            select(
+                Message.id, Message.sender_email, Message.content,
+                Message.is_from_agency, Message.timestamp
+            )
+            .where(Message.conversation_id == Conversation.id)
+            .order_by(desc(Message.timestamp), desc(Message.id))
+            .limit(1)
+            .lateral("latest_message")
+        )
+        query = (
+            select(
+                Conversation.id, Conversation.name, Conversation.user_email, Conversation.project_id,
+                Conversation.shared_state, Conversation.threads, Conversation.settings,
+                Conversation.is_pinned, Conversation.created_at, Conversation.updated_at,
+                latest.c.id.label("message_id"), latest.c.sender_email, latest.c.content,
+                latest.c.is_from_agency, latest.c.timestamp
+            )
+            .outerjoin(latest, true())
+            .where(Conversation.user_email == email)
+        )
+        if project_id:
+            query = query.where(Conversation.project_id == project_id)
+        
+        query = _conversation_keyset(query, after, ascending)
+        
+        if offset > 0:
+            query = query.offset(offset)
+        if limit > 0:
+            query = query.limit(limit)
+        
+        return [
+            ConversationDto.model_construct(
+                id=row.id,
+                name=row.name,
+                user_email=row.user_email,
+                project_id=row.project_id,
+                shared_state=row.shared_state,
+                threads=row.threads,
+                settings=row.settings,
+                is_pinned=row.is_pinned,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                latest_message=MessageDto.model_construct(
+                    id=str(row.message_id),
+                    conversation_id=row.id,
+                    sender=row.sender_email,
+                    content=row.content,
+                    is_from_agency=row.is_from_agency,
+                    timestamp=row.timestamp.isoformat() if row.timestamp else None
+                ) if row.message_id is not None else None
+            )
+            for row in await self.db.execute(query)
+        ]
+    
+    @staticmethod
+    def encode_cursor(conversation) -> str:
+        """Cursor pointing just past `conversation` (a ConversationDto from list_dtos_for_user) in keyset order."""
+        return encode_cursor(conversation.is_pinned, conversation.updated_at, conversation.id)
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[bool, datetime.datetime, str]:
+        """Keyset position (is_pinned, updated_at, id) held by a cursor from encode_cursor; raises ValueError if malformed."""
+        is_pinned, updated_at, conversation_id = decode_cursor(cursor, 3)
+        return bool(is_pinned), parse_cursor_timestamp(updated_at), str(conversation_id)
+    
+    async def get_summaries_for_user(self, email: str, limit: int = 0, offset: int = 0, ascending: bool = False) -> List[ConversationSummaryDto]:
+        """
+        Get ConversationSummaryDtos (id, name, updated_at, is_pinned) for a user's conversations.
+        
+        Pinned first, then by updated_at, like list_dtos_for_user, but selects only the listed
+        columns so no ORM entities or JSON state are materialized.
+        """
+        query = select(
+            Conversation.id, Conversation.name, Conversation.updated_at, Conversation.is_pinned
+        ).where(Conversation.user_email == email)
+        
+        if ascending:
+            query = query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.asc())
+        else:
+            query = query.order_by(Conversation.is_pinned.desc(), Conversation.updated_at.desc())
+        
+        if offset > 0:
+            query = query.offset(offset)
+        if limit > 0:
+            query = query.limit(limit)
+        
+        return [ConversationRepository._summary_dto(row) for row in await self.db.execute(query)]
+
 class MessageRepository(BaseRepository[Message]):
     """Repository for Message entity."""
     
     def __init__(self, db: Session):
         super().__init__(db, Message)
     
-    def get_for_conversation(self, conversation_id: str, limit: int = 50, offset: int = 0) -> List[Message]:
-        """Get messages for a conversation with pagination."""
-        # Use select() for better query control
-        query = select(Message).where(
-            Message.conversation_id == conversation_id
-        ).order_by(desc(Message.timestamp)).offset(offset).limit(limit)
+    def get_for_conversation(self, conversation_id: str, limit: int = 50, before_ts: Optional[datetime.datetime] = None, before_id: Optional[int] = None) -> List[Message]:
+        """
+        Get messages for a conversation, newest first, with keyset pagination.
         
-        # Execute with connection for better performance
-        result = self.db.execute(query)
-        return result.scalars().all()
-    
-    def get_conversation_history(self, conversation_id: str) -> List[Message]:
-        """Get all messages for a conversation in chronological order (oldest first)."""
-        query = select(Message).where(
-            Message.conversation_id == conversation_id
-        ).order_by(asc(Message.timestamp))
+        Args:
+            conversation_id: The ID of the conversation
+            limit: Maximum number of messages to return
+            before_ts: Timestamp of the last message of the previous page (None for the first page)
+            before_id: ID of the last message of the previous page; required together with before_ts
+        
+        Returns:
+            List of messages older than (before_ts, before_id)
+        """
+        params = {"conversation_id": conversation_id, "limit": limit}
+        if before_ts is None:
+            return self.db.scalars(_MESSAGES_NEWEST_FIRST_STMT, params).all()
         
-        result = self.db.execute(query)
-        return result.scalars().all()
+        # Seek past the previous page via idx_message_conv_ts_id_desc instead of scanning and discarding OFFSET rows
+        params.update(before_ts=before_ts, before_id=before_id)
+        return self.db.scalars(_MESSAGES_BEFORE_STMT, params).all()
     
-    def get_messages_flexible(self, conversation_id: str, limit: int = 50, offset: int = 0, ascending: bool = False) -> List[Message]:
+    def get_messages_page(self, conversation_id: str, cursor: Optional[Tuple[datetime.datetime, int]] = None, limit: int = 50, ascending: bool = False) -> Tuple[List[Message], Optional[Tuple[datetime.datetime, int]]]:
         """
-        Get messages for a conversation with flexible options.
+        One keyset page of a conversation's messages in either direction.
         
         Args:
             conversation_id: The ID of the conversation
-            limit: Maximum number of messages to return (0 for all messages)
-            offset: Number of messages to skip
-            ascending: If True, order by timestamp ascending (oldest first), otherwise descending (newest first)
-            
+            cursor: (timestamp, id) of the last message of the previous page; None for the first page
+            limit: Maximum number of messages to return
+            ascending: If True, oldest first (pages move forward in time), otherwise newest first
+        
         Returns:
-            List of messages
+            (messages, next_cursor); next_cursor is None once the last page has been returned
         """
-        # Build the base query
-        query = select(Message).where(Message.conversation_id == conversation_id)
+        if not ascending:
+            before_ts, before_id = cursor if cursor is not None else (None, None)
+            messages = self.get_for_conversation(conversation_id, limit=limit, before_ts=before_ts, before_id=before_id)
+        else:
+            query = select(Message).where(Message.conversation_id == conversation_id)
+            if cursor is not None:
+                # Backward scan of idx_message_conv_ts_id_desc; same seek, opposite direction
+                query = query.where(tuple_(Message.timestamp, Message.id) > tuple_(*cursor))
+            messages = self.db.scalars(query.order_by(asc(Message.timestamp), asc(Message.id)).limit(limit)).all()
+        
+        next_cursor = (messages[-1].timestamp, messages[-1].id) if len(messages) == limit else None
+        return messages, next_cursor
+    
+    def get_message_dtos_page(self, conversation_id: str, limit: int = 50, offset: int = 0, ascending: bool = False) -> Tuple[List[MessageDto], int]:
+        """
+        Page of a conversation's messages as MessageDtos built directly from result rows,
+        plus the conversation's total message count read from count(*) OVER () on the same query.
+        Only a page past the end needs the separate count.
+        """
+        query = self._flexible_query(
+            select(
+                Message.id, Message.conversation_id, Message.sender_email,
+                Message.content, Message.is_from_agency, Message.timestamp,
+                func.count().over().label("total_count")
+            ),
+            conversation_id, limit, offset, ascending
+        )
+        rows = self.db.execute(query).all()
+        if rows:
+            total = rows[0].total_count
+        else:
+            total = self.count_for_conversation(conversation_id) if offset > 0 else 0
+        message_dtos = [
+            MessageDto.model_construct(
+                id=str(row.id),
+                conversation_id=row.conversation_id,
+                sender=row.sender_email,
+                content=row.content,
+                is_from_agency=row.is_from_agency,
+                timestamp=row.timestamp.isoformat() if row.timestamp else None
+            )
+            for row in rows
+        ]
+        return message_dtos, total
+    
+    def get_message_dtos_cursor(self, conversation_id: str, cursor: Optional[str] = None, limit: int = 50, ascending: bool = False) -> Tuple[List[MessageDto], Optional[str]]:
+        """
+        get_messages_page behind an opaque cursor string, returning MessageDtos.
+        
+        Returns:
+            (message_dtos, next_cursor); next_cursor is None once the last page has been returned
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        messages, next_position = self.get_messages_page(
+            conversation_id, self.decode_cursor(cursor) if cursor else None, limit=limit, ascending=ascending
+        )
+        next_cursor = encode_cursor(*next_position) if next_position is not None else None
+        return [MessageDto.from_db_model(message) for message in messages], next_cursor
+    
+    @staticmethod
+    def encode_cursor(message: MessageDto) -> str:
+        """Cursor pointing just past `message` in (timestamp, id) order."""
+        return encode_cursor(message.timestamp, int(message.id))
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+        """Keyset position (timestamp, id) held by a cursor from encode_cursor; raises ValueError if malformed."""
+        timestamp, message_id = decode_cursor(cursor, 2)
+        if not isinstance(message_id, int):
+            raise ValueError("Invalid cursor")
+        return parse_cursor_timestamp(timestamp), message_id
+    
+    @staticmethod
+    def _flexible_query(query, conversation_id: str, limit: int, offset: int, ascending: bool):
+        """Applies the conversation filter, timestamp ordering and offset/limit paging shared by the flexible getters."""
+        query = query.where(Message.conversation_id == conversation_id)
         
         # Add ordering
+        # id breaks timestamp ties, so offset pages line up with the keyset pages of get_messages_page
         if ascending:
-            query = query.order_by(asc(Message.timestamp))
+            query = query.order_by(asc(Message.timestamp), asc(Message.id))
         else:
-            query = query.order_by(desc(Message.timestamp))
+            query = query.order_by(desc(Message.timestamp), desc(Message.id))
         
         # Add offset
         if offset > 0:
@@ -514,30 +867,26 @@ class MessageRepository(BaseRepository[Message]):
         if limit > 0:
             query = query.limit(limit)
         
-        # Execute the query
-        result = self.db.execute(query)
-        return result.scalars().all()
+        return query
     
     def count_for_conversation(self, conversation_id: str) -> int:
         """Get the total count of messages in a conversation efficiently."""
-        # Use func.count() for an efficient database count query
-        query = select(func.count(Message.id)).where(Message.conversation_id == conversation_id)
-        count = self.db.execute(query).scalar_one_or_none()
+        count = self.db.scalar(_COUNT_MESSAGES_STMT, {"conversation_id": conversation_id})
         return count if count is not None else 0
     
     def create_from_dto(self, dto: SendMessageDto, sender_email: str, is_from_agency: bool = False) -> Message:
         """Create a message from DTO."""
-        message = Message(
-            content=dto.content,
-            conversation_id=dto.conversation_id,
-            sender_email=sender_email,
-            is_from_agency=is_from_agency
+        # The messages_touch_conversation trigger bumps the conversation's and project's updated_at
+        message = self.db.scalar(
+            insert(Message).values(
+                content=dto.content,
+                conversation_id=dto.conversation_id,
+                sender_email=sender_email,
+                is_from_agency=is_from_agency
+            ).returning(Message)
         )
-        conversation_repo = ConversationRepository(self.db)
-        conversation_repo.update_conversation(dto.conversation_id)
-        self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
+        commit_or_flush(self.db)
+        _expire_if_loaded(self.db, Conversation, dto.conversation_id, _MESSAGE_TRIGGER_ATTRS)
         return message
     
     def create_system_message(self, conversation_id: str, content: str, is_from_agency: bool = True) -> Message:
@@ -549,45 +898,55 @@ class MessageRepository(BaseRepository[Message]):
             is_from_agency=is_from_agency
         )
         self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
+        commit_or_flush(self.db)
         return message
     
     def to_dto(self, message: Message) -> MessageDto:
         """Convert Message model to MessageDto."""
         return MessageDto.from_db_model(message)
     
-    def bulk_create_messages(self, messages_data: List[Dict[str, Any]]) -> List[Message]:
-        """Creates multiple messages in bulk."""
-        db_messages = [Message(**data) for data in messages_data]
-        self.db.add_all(db_messages)
-        # Commit handled by calling context
-        return db_messages
-
-    def delete_messages_by_conversation_ids(self, conversation_ids: List[str]) -> int:
-        """Deletes all messages associated with the given conversation IDs."""
-        if not conversation_ids:
-            return 0
-        try:
-            num_deleted = self.db.query(Message).filter(Message.conversation_id.in_(conversation_ids)).delete(synchronize_session=False)
-            # Let the service layer handle commit/rollback
-            # self.db.commit()
-            logger.info(f"Marked {num_deleted} messages for deletion associated with conversations: {conversation_ids}")
-            return num_deleted
-        except SQLAlchemyError as e:
-            # self.db.rollback()
-            logger.error(f"Error deleting messages for conversations {conversation_ids}: {e}", exc_info=True)
-            raise # Re-raise the exception
+    def bulk_create_messages(self, messages_data: Iterable[Dict[str, Any]], return_rows: bool = False) -> Union[int, List[Dict[str, Any]]]:
+        """
+        Creates messages with Core multi-row INSERTs, _BULK_INSERT_BATCH rows per statement, and a single commit.
+        
+        No Message instances are built, and messages_data may be any iterable (e.g. a generator),
+        so only one batch of rows is held in memory unless return_rows is set.
+        
+        Args:
+            messages_data: Dicts of Message column values (content, conversation_id, sender_email, is_from_agency)
+            return_rows: Return the created rows instead of their count
+        
+        Returns:
+            The number of messages created, or with return_rows, copies of the input dicts with id and
+            timestamp filled in from RETURNING, in input order
+        """
+        created: List[Dict[str, Any]] = []
+        count = 0
+        conversation_ids = set()
+        it = iter(messages_data)
+        while batch := list(islice(it, _BULK_INSERT_BATCH)):
+            conversation_ids.update(data["conversation_id"] for data in batch)
+            if return_rows:
+                result = self.db.execute(_BULK_INSERT_MESSAGES_STMT, batch)
+                created.extend({**data, "id": row.id, "timestamp": row.timestamp} for data, row in zip(batch, result))
+            else:
+                self.db.execute(insert(Message.__table__), batch)
+            count += len(batch)
+        if not count:
+            return created if return_rows else 0
+        commit_or_flush(self.db)
+        for conversation_id in conversation_ids:
+            _expire_if_loaded(self.db, Conversation, conversation_id, _MESSAGE_TRIGGER_ATTRS)
+        return created if return_rows else count
 
 class GoogleOAuthTokenRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def get_token(self, user_email: str, service_name: GoogleService) -> Optional[GoogleOAuthToken]:
-        return self.db.query(GoogleOAuthToken).filter(
-            GoogleOAuthToken.user_email == user_email,
-            GoogleOAuthToken.service_name == service_name
-        ).first()
+        return self.db.execute(
+            _TOKEN_BY_USER_SERVICE_STMT, {"user_email": user_email, "service_name": service_name}
+        ).scalar_one_or_none()
 
     def create_or_update_token(
         self,
@@ -618,22 +977,25 @@ class GoogleOAuthTokenRepository:
                 'refresh_token': stmt.excluded.refresh_token, 
                 'expires_at': stmt.excluded.expires_at,
                 'scopes': stmt.excluded.scopes,
-                'updated_at': datetime.datetime.now(datetime.timezone.utc)
+                'updated_at': func.now()
             }
         )
         
-        result = self.db.execute(on_conflict_stmt.returning(GoogleOAuthToken))
-        self.db.commit()
-        token_orm = result.scalar_one_or_none()
-        
-        if token_orm:
-             self.db.refresh(token_orm)
+        # RETURNING hydrates the full row; populate_existing overwrites a copy already in the session,
+        # so no refresh() SELECT is needed
+        token_orm = self.db.execute(
+            on_conflict_stmt.returning(GoogleOAuthToken),
+            execution_options={"populate_existing": True}
+        ).scalar_one_or_none()
+        commit_or_flush(self.db)
         return token_orm
 
     def delete_token(self, user_email: str, service_name: GoogleService) -> bool:
-        token = self.get_token(user_email=user_email, service_name=service_name)
-        if token:
-            self.db.delete(token)
-            self.db.commit()
-            return True
-        return False
+        result = self.db.execute(
+            delete(GoogleOAuthToken).where(
+                GoogleOAuthToken.user_email == user_email,
+                GoogleOAuthToken.service_name == service_name,
+            )
+        )
+        commit_or_flush(self.db)
+        return result.rowcount > 0
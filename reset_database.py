@@ -1,3 +1,5 @@
+import sys
+from sqlalchemy import text
 from database import engine, Base
 import logging
 from models import User, Conversation, Message
@@ -12,9 +14,10 @@ def reset_database():
     WARNING: This will delete all data in the database!
     """
     try:
-        # Drop all tables
+        # Drop all tables in one transaction: one commit, and a failure leaves the schema untouched
         logger.info("Dropping all tables...")
-        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as connection:
+            Base.metadata.drop_all(bind=connection)
         logger.info("Successfully dropped all tables in the database")
         
         # Recreate all tables
@@ -26,11 +29,32 @@ def reset_database():
         logger.error(f"Error resetting database: {e}")
         raise
 
+def reset_data():
+    """
+    Deletes all rows from every table but keeps the schema, indexes and Alembic version.
+    A single TRUNCATE is far faster than dropping and recreating the tables.
+    WARNING: This will delete all data in the database!
+    """
+    try:
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        logger.info(f"Truncating tables: {tables}")
+        with engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        logger.info("Successfully deleted all data in the database")
+    
+    except Exception as e:
+        logger.error(f"Error truncating database: {e}")
+        raise
+
 if __name__ == "__main__":
     # Ask for confirmation before proceeding
     confirmation = input("WARNING: This will delete ALL data in the database. Are you sure? (yes/no): ")
     
     if confirmation.lower() == 'yes':
-        reset_database()
+        # --data-only empties the tables and keeps the schema
+        if "--data-only" in sys.argv[1:]:
+            reset_data()
+        else:
+            reset_database()
     else:
         logger.info("Operation cancelled by user") 
\ No newline at end of file
@@ -12,23 +12,13 @@ def reset_all_pins():
     This script can be run anytime you want to unpin all conversations.
     """
     try:
-        with engine.connect() as connection:
-            # Check if column exists first
+        # engine.begin() commits on exit and returns the connection to the pool promptly
+        with engine.begin() as connection:
+            # Only rewrite rows that are actually pinned; already-unpinned rows cost no WAL or heap churn
             result = connection.execute(text(
-                "SELECT column_name FROM information_schema.columns "
-                "WHERE table_name='conversations' AND column_name='is_pinned'"
+                "UPDATE conversations SET is_pinned = FALSE WHERE is_pinned"
             ))
             
-            if result.rowcount == 0:
-                logger.error("is_pinned column does not exist in conversations table")
-                return
-            
-            # Update all conversations to set is_pinned to False
-            result = connection.execute(text(
-                "UPDATE conversations SET is_pinned = FALSE"
-            ))
-            connection.commit()
-            
             # Get count of updated rows
             row_count = result.rowcount
             logger.info(f"Reset pinned status for {row_count} conversations")
@@ -1,3 +1,4 @@
+import os
 from agency_swarm import Agent
 from dotenv import load_dotenv
 
@@ -10,12 +11,17 @@ from .tools.RetrieveClientContextTool import RetrieveClientContextTool
 # Load environment variables, especially OPENAI_API_KEY
 load_dotenv("../.env") # Load .env from the agency root directory
 
+# Read once per process; Agent accepts the text itself as well as a path, so each new
+# SEOEngineer (one per conversation agency) skips the file lookup and read
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "instructions.md"), encoding="utf-8") as _f:
+    _INSTRUCTIONS = _f.read()
+
 class SEOEngineer(Agent):
     def __init__(self):
         super().__init__(
             name="SEOEngineer",
             description="Generates BoFu and ToFu/MoFu keywords based on project data.",
-            instructions="./instructions.md", # Path to the instructions file
+            instructions=_INSTRUCTIONS, # Contents of ./instructions.md, loaded at import
             # Explicitly list the tools the agent can use
             tools=[
                 BoFuListTool,
@@ -11,6 +11,17 @@ from api_clients import DataForSEOClient
 from api_clients import FireCrawlClient
 import openai
 import traceback
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+# Products processed at once; bounds concurrent OpenAI and DataForSEO requests
+MAX_PRODUCT_WORKERS = 8
+
+# Shared so seed generation reuses pooled keep-alive connections instead of a new client per product.
+# Built on first use, so a missing OPENAI_API_KEY fails the call (caught below) rather than the import
+@lru_cache(maxsize=None)
+def _get_openai_client():
+    return openai.OpenAI()
 
 class BoFuListTool(BaseTool):
     """
@@ -59,39 +70,27 @@ class BoFuListTool(BaseTool):
         # Initialize keywords by product dictionary
         keywords_by_product = {}
 
-        # Process each product (row in the DataFrame)
-        for index, product in enumerate(products):
-
-            seeds = self._get_bofu_seeds(product, target_personas)
-
-            product_name = product.get('name', '')
-            if not product_name:
-                 print(f"Skipping product at index {index} due to missing name.")
-                 continue # Skip if name is missing
-
-            print(f"Processing product: {product_name}")
-
-            # Get keywords by product name using dynamic location/language
-            try:
-                product_keywords = DataForSEOClient.get_keywords_for_keywords(seeds, target_location, target_language)
-                keywords_by_product[product_name] = product_keywords
-            except Exception as e:
-                print(f"Error getting keywords for {product_name}: {str(e)}")
+        # Each product is an OpenAI call followed by a DataForSEO call, both network-bound, so
+        # products run concurrently; results are collected in product order
+        with ThreadPoolExecutor(max_workers=min(MAX_PRODUCT_WORKERS, len(products))) as executor:
+            futures = [
+                executor.submit(self._process_product, index, product, target_personas, target_location, target_language)
+                for index, product in enumerate(products)
+            ]
+            for future in futures:
+                result = future.result()
+                if result is not None:
+                    product_name, product_keywords = result
+                    keywords_by_product[product_name] = product_keywords
 
         # If we have keywords, get keyword overview data in bulk
         if keywords_by_product:
             # Limit keywords per product to 500
-            for product_name in keywords_by_product:
-                if len(keywords_by_product[product_name]) > 500:
-                    keywords_by_product[product_name] = keywords_by_product[product_name][:500]
-                    print(f"Truncated keywords for {product_name} to 500.")
+            keywords_by_product = {name: keywords[:500] for name, keywords in keywords_by_product.items()}
 
-                try:
-                    # Get keyword overview data in bulk using dynamic location/language
-                    keyword_data = DataForSEOClient.get_keyword_overview(product_name, keywords_by_product[product_name], target_location, target_language)
-                    keywords_list.extend(keyword_data)
-                except Exception as e:
-                    print(f"Error processing keyword overview data for {product_name}: {str(e)}")
+            # One overview request per 700 distinct keywords across all products, not one per product
+            keyword_data = DataForSEOClient.get_keyword_overview_batch(keywords_by_product, target_location, target_language)
+            keywords_list.extend(keyword_data)
 
 
         # Generate timestamp for filename
@@ -105,12 +104,8 @@ class BoFuListTool(BaseTool):
         }
 
         # --- Save the results to shared state --- 
-        # Check if the 'keywords_output' key exists in shared state
-        if not self._shared_state.get('keywords_output'):
-            # If it doesn't exist, create an empty dictionary
-            self._shared_state.set('keywords_output', {})
-        # Get the existing keywords_output dictionary
-        keywords_output = self._shared_state.get('keywords_output')
+        # Get the existing keywords_output dictionary, or start one
+        keywords_output = self._shared_state.get('keywords_output') or {}
         # Add the new table to the existing dictionary
         keywords_output[table_id] = table_dict
         # Update the shared state with the new dictionary
@@ -129,6 +124,27 @@ class BoFuListTool(BaseTool):
         return f"Keywords table {table_id} has been saved to shared state."
 
 
+    def _process_product(self, index, product, target_personas, target_location, target_language):
+        """
+        Seeds and related keywords for one product; returns (product_name, keywords) or None if skipped/failed.
+        Agent is not allowed to call this method directly.
+        """
+        product_name = product.get('name', '')
+        if not product_name:
+            print(f"Skipping product at index {index} due to missing name.")
+            return None # Skip if name is missing
+
+        seeds = self._get_bofu_seeds(product, target_personas)
+
+        print(f"Processing product: {product_name}")
+
+        # Get keywords by product name using dynamic location/language
+        try:
+            return product_name, DataForSEOClient.get_keywords_for_keywords(seeds, target_location, target_language)
+        except Exception as e:
+            print(f"Error getting keywords for {product_name}: {str(e)}")
+            return None
+
     def _get_bofu_seeds(self, product, target_personas):
         """
         Internal method to get BoFu seeds for a product.
@@ -191,9 +207,7 @@ class BoFuListTool(BaseTool):
         """
         try:
             # Generate seed keywords with OpenAI
-            client = openai.OpenAI()
-
-            response = client.chat.completions.create(
+            response = _get_openai_client().chat.completions.create(
                 model="gpt-4o-2024-08-06",
                 messages=[
                     {"role": "system", "content": "You are an expert SEO Keyword Strategist. Your task is to generate exactly 10 high-intent, Bottom-of-Funnel (BoFu) keywords based on the offering information provided in the user message. Focus primarily on the Offering Description, Target Persona, and URL Summary to create keywords that accurately represent the offering's specific attributes and value proposition. Keywords should reflect plausible search queries from the target persona in their final decision stage. While the Offering Name provides context, keywords don't need to include it explicitly but must be highly relevant. Strictly output ONLY the 10 keywords, comma-separated, with no other text."},
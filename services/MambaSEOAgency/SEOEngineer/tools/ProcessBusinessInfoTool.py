@@ -7,6 +7,10 @@ from dotenv import load_dotenv
 
 
 from api_clients import FireCrawlClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Product pages scraped at once
+MAX_SCRAPE_WORKERS = 16
 
 
 class ProcessBusinessInfoTool(BaseTool):
@@ -28,11 +32,31 @@ class ProcessBusinessInfoTool(BaseTool):
             return f"Error: Could not retrieve business information from shared state: {e}"
         
         try:
+            # Products sharing a URL (duplicate entries, a common landing page) are scraped once
+            products_by_url = {}
             for product in business_info_data['products_services']:
                 if 'url' in product and product['url']:
-                    product['url_summary'] = FireCrawlClient.extract_product_url_summary(product['url'])
+                    products_by_url.setdefault(product['url'], []).append(product)
                 else:
                     product['url_summary'] = ""
+
+            # Each summary is a multi-second scrape; run them concurrently. A failed scrape leaves
+            # that product without a summary instead of failing the whole tool
+            if products_by_url:
+                with ThreadPoolExecutor(max_workers=min(MAX_SCRAPE_WORKERS, len(products_by_url))) as executor:
+                    futures = {
+                        executor.submit(FireCrawlClient.extract_product_url_summary_cached, url): url
+                        for url in products_by_url
+                    }
+                    for future in as_completed(futures):
+                        url = futures[future]
+                        try:
+                            url_summary = future.result()
+                        except Exception as e:
+                            print(f"Error extracting url summary for {url}: {e}")
+                            url_summary = ""
+                        for product in products_by_url[url]:
+                            product['url_summary'] = url_summary
         except Exception as e:
             return f"Error: Could not extract product url summary: {e}"
         
@@ -62,42 +86,44 @@ class ProcessBusinessInfoTool(BaseTool):
         Returns:
             str: Markdown formatted string of the business information
         """
-        markdown = f"# {business_info['company_name']}\n\n"
+        parts = [f"# {business_info['company_name']}\n\n"]
 
         # Basic business information
-        markdown += "## Business Overview\n"
-        markdown += f"- **Location:** {business_info['location']}\n"
-        markdown += f"- **Market Geography:** {business_info['market_geo']}\n"
-        markdown += f"- **Niche:** {business_info['niche']}\n"
-        markdown += f"- **Website:** {business_info['website']}\n\n"
+        parts.append("## Business Overview\n")
+        parts.append(f"- **Location:** {business_info['location']}\n")
+        parts.append(f"- **Market Geography:** {business_info['market_geo']}\n")
+        parts.append(f"- **Niche:** {business_info['niche']}\n")
+        parts.append(f"- **Website:** {business_info['website']}\n\n")
 
         # Value propositions
-        markdown += "## Value Propositions\n"
+        parts.append("## Value Propositions\n")
         value_props = business_info['value_props']
 
-        markdown += f"{value_props}\n\n"
+        parts.append(f"{value_props}\n\n")
 
         # Target personas
-        markdown += "## Target Personas\n"
-        markdown += f"{business_info['target_personas']}\n\n"
+        parts.append("## Target Personas\n")
+        parts.append(f"{business_info['target_personas']}\n\n")
 
         # Products and services
-        markdown += "## Products & Services\n"
+        parts.append("## Products & Services\n")
 
         for product in business_info['products_services']:
-            markdown += f"### {product['name']} (Priority: {product['priority']})\n"
-            markdown += f"- **Description:** {product['description']}\n"
-            markdown += f"- **Target Persona:** {product['target_persona']}\n"
+            parts.append(f"### {product['name']} (Priority: {product['priority']})\n")
+            parts.append(f"- **Description:** {product['description']}\n")
+            parts.append(f"- **Target Persona:** {product['target_persona']}\n")
             if 'url' in product and product['url']:
-                markdown += f"- **URL:** {product['url']}\n"
+                parts.append(f"- **URL:** {product['url']}\n")
             else:
-                markdown += f"- **URL:** None\n"
+                parts.append(f"- **URL:** None\n")
             if 'url_summary' in product and product['url_summary']:
-                markdown += f"- **URL Summary:** {product['url_summary']}\n"
+                parts.append(f"- **URL Summary:** {product['url_summary']}\n")
             else:
-                markdown += f"- **URL Summary:** None\n"
-            markdown += "\n"
+                parts.append(f"- **URL Summary:** None\n")
+            parts.append("\n")
         
+        markdown = "".join(parts)
+
         print("Client context stored in shared state under key 'client_context'")
         return markdown
 
@@ -37,44 +37,46 @@ class RetrieveClientContextTool(BaseTool):
         """
         project_data = project.get('project_data', {})
         
-        markdown = f"# {project.get('name', 'Project')}\n\n"
+        parts = [f"# {project.get('name', 'Project')}\n\n"]
 
         # Basic project information
-        markdown += "## Project Overview\n"
-        markdown += f"- **Website:** {project.get('website_url', 'N/A')}\n"
-        markdown += f"- **Market Geography:** {project_data.get('geo_market', 'N/A')}\n\n"
+        parts.append("## Project Overview\n")
+        parts.append(f"- **Website:** {project.get('website_url', 'N/A')}\n")
+        parts.append(f"- **Market Geography:** {project_data.get('geo_market', 'N/A')}\n\n")
 
         # Company summary if available
         if project_data.get('company_summary'):
-            markdown += "## Company Summary\n"
-            markdown += f"{project_data.get('company_summary')}\n\n"
+            parts.append("## Company Summary\n")
+            parts.append(f"{project_data.get('company_summary')}\n\n")
 
         # Products
         if project_data.get('products'):
-            markdown += "## Products\n"
+            parts.append("## Products\n")
             for product in project_data.get('products', []):
                 priority = product.get('priority', 'N/A')
-                markdown += f"### {product.get('name', 'Unnamed Product')} (Priority: {priority})\n"
-                markdown += f"- **Description:** {product.get('description', 'No description')}\n"
+                parts.append(f"### {product.get('name', 'Unnamed Product')} (Priority: {priority})\n")
+                parts.append(f"- **Description:** {product.get('description', 'No description')}\n")
                 if product.get('url'):
-                    markdown += f"- **URL:** {product.get('url')}\n"
-                markdown += "\n"
+                    parts.append(f"- **URL:** {product.get('url')}\n")
+                parts.append("\n")
 
         # Personas
         if project_data.get('personas'):
-            markdown += "## Target Personas\n"
+            parts.append("## Target Personas\n")
             for persona in project_data.get('personas', []):
                 priority = persona.get('priority', 'N/A')
-                markdown += f"### {persona.get('name', 'Unnamed Persona')} (Priority: {priority})\n"
-                markdown += f"- **Description:** {persona.get('description', 'No description')}\n\n"
+                parts.append(f"### {persona.get('name', 'Unnamed Persona')} (Priority: {priority})\n")
+                parts.append(f"- **Description:** {persona.get('description', 'No description')}\n\n")
 
         # Competitors
         if project_data.get('competitors'):
-            markdown += "## Competitors\n"
+            parts.append("## Competitors\n")
             for competitor in project_data.get('competitors', []):
-                markdown += f"### {competitor.get('name', 'Unnamed Competitor')}\n"
-                markdown += f"- **Description:** {competitor.get('description', 'No description')}\n\n"
+                parts.append(f"### {competitor.get('name', 'Unnamed Competitor')}\n")
+                parts.append(f"- **Description:** {competitor.get('description', 'No description')}\n\n")
         
+        markdown = "".join(parts)
+
         # Store the generated context for future use
         self._shared_state.set('client_context', markdown)
         
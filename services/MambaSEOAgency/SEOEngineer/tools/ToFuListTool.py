@@ -11,6 +11,13 @@ from api_clients import DataForSEOClient
 from api_clients import FireCrawlClient
 import openai
 import traceback
+from functools import lru_cache
+
+# Shared so seed generation reuses pooled keep-alive connections instead of a new client per product.
+# Built on first use, so a missing OPENAI_API_KEY fails the call (caught below) rather than the import
+@lru_cache(maxsize=None)
+def _get_openai_client():
+    return openai.OpenAI()
 
 class ToFuListTool(BaseTool):
     """
@@ -101,12 +108,8 @@ class ToFuListTool(BaseTool):
         }
 
         # --- Save the results to shared state --- 
-        # Check if the 'keywords_output' key exists in shared state
-        if not self._shared_state.get('keywords_output'):
-            # If it doesn't exist, create an empty dictionary
-            self._shared_state.set('keywords_output', {})
-        # Get the existing keywords_output dictionary
-        keywords_output = self._shared_state.get('keywords_output')
+        # Get the existing keywords_output dictionary, or start one
+        keywords_output = self._shared_state.get('keywords_output') or {}
         # Add the new table to the existing dictionary
         keywords_output[table_id] = table_dict
         # Update the shared state with the new dictionary
@@ -179,9 +182,7 @@ class ToFuListTool(BaseTool):
         """
         try:
             # Generate seed keywords with OpenAI
-            client = openai.OpenAI()
-
-            response = client.chat.completions.create(
+            response = _get_openai_client().chat.completions.create(
                 model="gpt-4o-2024-08-06",
                 messages=[
                     {"role": "system", "content": "You are an expert SEO Keyword Strategist. Your task is to generate exactly 10 Top-of-Funnel (ToFu) and Middle-of-Funnel (MoFu) keywords based on the offering information provided. Focus on the Offering Description, Target Persona (problems, questions, goals), and URL Summary to create keywords reflecting informational and consideration-stage searches. Keywords should represent problems, solutions, benefits, comparisons, or educational queries relevant to the offering's space. Strictly output ONLY the 10 keywords, comma-separated, with no other text."},
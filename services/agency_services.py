@@ -4,6 +4,7 @@ import logging
 from fastapi import HTTPException, status
 from cachetools import TTLCache # Changed from LRUCache to TTLCache
 from threading import Lock
+import copy
 logger = logging.getLogger(__name__)
 
 # Define a maximum number of agency instances to keep in memory.
@@ -39,6 +40,35 @@ class ThreadSafeTTLCache:
         with self.lock:
             return len(self.cache)
 
+def _threads_callbacks(conversation_repo, conversation_id: str) -> dict:
+    """
+    threads_callbacks that write only what changed since the last load/save.
+
+    Agency hands the whole threads dict to 'save' every time one thread is created; merging just the
+    changed top-level entries keeps the write proportional to the change instead of the document.
+    """
+    last_persisted = {}
+
+    def remember(threads):
+        last_persisted.clear()
+        last_persisted.update(copy.deepcopy(threads or {}))
+
+    def load():
+        threads = conversation_repo.load_threads(conversation_id)
+        remember(threads)
+        return threads
+
+    def save(threads):
+        if last_persisted.keys() - threads.keys():
+            conversation_repo.save_threads(conversation_id, threads)  # A removed key needs a full write
+        else:
+            changed = {key: value for key, value in threads.items() if last_persisted.get(key) != value}
+            if changed:
+                conversation_repo.merge_threads(conversation_id, changed)
+        remember(threads)
+
+    return {'load': load, 'save': save}
+
 class AgencyService:
     # Use an LRU cache for agency instances
     agency_cache: ThreadSafeTTLCache = ThreadSafeTTLCache(maxsize=MAX_AGENCY_CACHE_SIZE, ttl=AGENCY_TTL_SECONDS)
@@ -69,10 +99,7 @@ class AgencyService:
                 [ceo], # Assuming 'agency_members' is the correct param name
                                       # If it's just `[ceo]`, change it back.
                 shared_instructions='./MambaSEOAgency/agency_manifesto.md', # Verify this path carefully!
-                threads_callbacks={
-                    'load': lambda: conversation_repo.load_threads(conversation_id),
-                    'save': lambda threads: conversation_repo.save_threads(conversation_id, threads),
-                },
+                threads_callbacks=_threads_callbacks(conversation_repo, conversation_id),
                 settings_callbacks={
                     'load': lambda: conversation_repo.load_settings(conversation_id),
                     'save': lambda settings: conversation_repo.save_settings(conversation_id, settings),
@@ -98,7 +125,15 @@ class AgencyService:
             
             # Persist any initial state changes made by Agency creation itself (if any).
             # The agency.shared_state.data might contain initial defaults set by the Agency.
-            conversation_repo.save_shared_state(conversation_id, agency.shared_state.data)
+            # Usually nothing or just 'project' differs from what was loaded, so merge only those keys,
+            # all in one UPDATE.
+            loaded_shared_state = initial_shared_state or {}
+            changed_shared_state = {
+                key: value for key, value in agency.shared_state.data.items()
+                if loaded_shared_state.get(key) != value
+            }
+            if changed_shared_state:
+                conversation_repo.merge_shared_state(conversation_id, changed_shared_state)
             
             cls.agency_cache[conversation_id] = agency
             logger.info(f"Cached new agency instance for conversation {conversation_id}. Cache size: {len(cls.agency_cache)}/{cls.agency_cache.maxsize}")
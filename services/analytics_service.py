@@ -1,13 +1,13 @@
 # services/analytics_service.py
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 from fastapi import HTTPException, status
 
 from sqlalchemy.orm import Session
 
 from models import GoogleService
-from services.google_oauth_service import GoogleOAuthService # To get valid access tokens
+from services.google_oauth_service import GoogleOAuthService, TokenStatus # To get valid access tokens
 
 logger = logging.getLogger(__name__)
 
@@ -21,19 +21,20 @@ class AnalyticsService:
         self.db = db
         self.google_oauth_service = GoogleOAuthService(db)
 
-    async def list_account_summaries(self, user_email: str) -> Optional[List[Dict[str, Any]]]:
+    async def list_account_summaries(self, user_email: str) -> Tuple[Optional[List[Dict[str, Any]]], TokenStatus]:
         """
         Lists the account summaries the user has access to in Google Analytics (GA4).
         Account summaries include accounts, properties, and data streams.
+        Returns (summaries, token_status); summaries is None when no usable access token exists.
         """
-        access_token = await self.google_oauth_service.get_valid_access_token(
+        access_token, token_status = await self.google_oauth_service.get_access_token_with_status(
             user_email=user_email,
             service_name=GoogleService.GOOGLE_ANALYTICS_4 
         )
 
         if not access_token:
-            logger.error(f"No valid access token available for Google Analytics for user {user_email}.")
-            return None
+            logger.error(f"No valid access token available for Google Analytics for user {user_email} ({token_status.value}).")
+            return None, token_status
 
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -64,7 +65,7 @@ class AnalyticsService:
                     if not next_page_token:
                         break 
                 
-                return all_account_summaries
+                return all_account_summaries, token_status
             except httpx.HTTPStatusError as e:
                 error_content = e.response.text
                 try:
@@ -81,19 +82,20 @@ class AnalyticsService:
                 logger.error(f"Unexpected error listing Google Analytics account summaries for {user_email}: {e}", exc_info=True)
                 raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while listing Google Analytics account summaries.")
 
-    async def run_ga4_report(self, user_email: str, property_id: str, report_request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def run_ga4_report(self, user_email: str, property_id: str, report_request: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], TokenStatus]:
         """
         Runs a report against the Google Analytics Data API v1beta.
         https://developers.google.com/analytics/devguides/reporting/data/v1/rest/v1beta/properties/runReport
+        Returns (report_data, token_status); report_data is None when no usable access token exists.
         """
-        access_token = await self.google_oauth_service.get_valid_access_token(
+        access_token, token_status = await self.google_oauth_service.get_access_token_with_status(
             user_email=user_email,
             service_name=GoogleService.GOOGLE_ANALYTICS_4
         )
 
         if not access_token:
-            logger.error(f"No valid access token available for Google Analytics Data API for user {user_email}, property {property_id}.")
-            return None
+            logger.error(f"No valid access token available for Google Analytics Data API for user {user_email}, property {property_id} ({token_status.value}).")
+            return None, token_status
 
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -111,7 +113,7 @@ class AnalyticsService:
                 response.raise_for_status()
                 
                 report_data = response.json()
-                return report_data
+                return report_data, token_status
             except httpx.HTTPStatusError as e:
                 error_content = e.response.text
                 try:
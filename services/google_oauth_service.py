@@ -2,9 +2,10 @@ import httpx
 import json
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urlencode
 import logging
+import enum
 
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
@@ -17,6 +18,12 @@ from database import get_valkey_connection # Or however you get your Valkey/Redi
 
 logger = logging.getLogger(__name__)
 
+class TokenStatus(enum.Enum):
+    """Outcome of looking up a usable access token, so callers can tell 'not connected' from 'temporarily unusable'."""
+    VALID = "valid"
+    MISSING = "missing"  # No token stored: the user never connected the service (or revoked it)
+    UNAVAILABLE = "unavailable"  # A token is stored but it expired and could not be refreshed
+
 # Google OAuth2 Endpoints
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
@@ -205,12 +212,20 @@ class GoogleOAuthService:
         it attempts to refresh it.
         Returns a valid access token or None if not available or refresh fails.
         """
+        access_token, _ = await self.get_access_token_with_status(user_email, service_name)
+        return access_token
+
+    async def get_access_token_with_status(self, user_email: str, service_name: GoogleService) -> Tuple[Optional[str], TokenStatus]:
+        """
+        Same as get_valid_access_token, but also reports why no token is available.
+        Returns (access_token, status); access_token is None unless status is TokenStatus.VALID.
+        """
         logger.info(f"Getting valid access token for user {user_email}, service {service_name.value}")
         stored_token_orm = self.token_repo.get_token(user_email=user_email, service_name=service_name)
 
         if not stored_token_orm:
             logger.warning(f"No token found for user {user_email}, service {service_name.value}.")
-            return None
+            return None, TokenStatus.MISSING
 
         buffer_seconds = 300 
         if datetime.now(timezone.utc) >= (stored_token_orm.expires_at - timedelta(seconds=buffer_seconds)):
@@ -218,10 +233,11 @@ class GoogleOAuthService:
             new_access_token = await self.refresh_access_token(user_email, service_name)
             if not new_access_token:
                 logger.error(f"Failed to refresh access token for {user_email}, {service_name.value}.")
-            return new_access_token
+                return None, TokenStatus.UNAVAILABLE
+            return new_access_token, TokenStatus.VALID
         
         logger.info(f"Returning stored, valid access token for user {user_email}, service {service_name.value}.")
-        return stored_token_orm.access_token
+        return stored_token_orm.access_token, TokenStatus.VALID
 
     async def revoke_token(self, user_email: str, service_name: GoogleService) -> bool:
         """
@@ -1,6 +1,7 @@
 from api_clients import OpenAIClient, FireCrawlClient
 import logging
 from sqlalchemy.orm import Session # type: ignore # Add Session import
+from sqlalchemy.exc import IntegrityError # type: ignore
 from repositories import ProjectRepository, ConversationRepository, MessageRepository # Add repo imports
 from models import Project, Conversation, Message # Add model imports
 from fastapi import HTTPException, status # type: ignore # Add HTTPException
@@ -40,7 +41,6 @@ async def delete_project_and_data(project_id: str, user_email: str, db: Session)
     """
     project_repo = ProjectRepository(db)
     conversation_repo = ConversationRepository(db)
-    message_repo = MessageRepository(db)
 
     # Verify project exists and belongs to the user (redundant check, but safe)
     project = project_repo.get_by_id(project_id)
@@ -68,18 +68,15 @@ async def delete_project_and_data(project_id: str, user_email: str, db: Session)
 
     try:
         # 1. Get all conversation IDs for the project
-        conversation_ids = [conv.id for conv in conversation_repo.get_for_project_raw(project_id)]
+        conversation_ids = conversation_repo.get_ids_for_project(project_id)
         
         if conversation_ids:
-            # 2. Delete all messages associated with those conversations
-            message_repo.delete_messages_by_conversation_ids(conversation_ids)
-            logger.info(f"Deleted messages for conversations associated with project {project_id}")
-
-            # 3. Delete all conversations associated with the project
+            # 2. Delete all conversations associated with the project; their messages go with them
+            #    through the messages.conversation_id ON DELETE CASCADE
             conversation_repo.delete_conversations_by_ids(conversation_ids)
             logger.info(f"Deleted conversations associated with project {project_id}")
 
-        # 4. Delete the project itself
+        # 3. Delete the project itself
         project_repo.delete(project)
         logger.info(f"Deleted project {project_id} successfully for user {user_email}")
 
@@ -129,11 +126,18 @@ async def update_project_specific_fields(project_id: str, user_email: str, updat
         
         # Commit the changes (assuming session management handles commit/rollback on success/failure)
         db.commit()
-        db.refresh(updated_project)
         logger.info(f"Project {project_id} updated successfully by user {user_email}. Fields updated: {list(updates_dict.keys())}")
         
         return project_repo.to_dto(updated_project)
     
+    except IntegrityError as e:
+        db.rollback()
+        if not ProjectRepository.is_duplicate_name(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Project with name '{updates_dict.get('name')}' already exists for this user."
+        )
     except Exception as e:
         db.rollback() # Explicit rollback on error within the service
         logger.error(f"Error updating project {project_id} for user {user_email}: {e}", exc_info=True)
@@ -143,7 +147,6 @@ async def update_project_specific_fields(project_id: str, user_email: str, updat
         )
 
 # Ensure necessary repository methods exist:
-# - ConversationRepository: get_for_project_raw(project_id) -> List[Conversation]
+# - ConversationRepository: get_ids_for_project(project_id) -> List[str]
 # - ConversationRepository: delete_conversations_by_ids(conversation_ids: List[str])
-# - MessageRepository: delete_messages_by_conversation_ids(conversation_ids: List[str])
 # - ProjectRepository: delete(project: Project)
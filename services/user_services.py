@@ -6,9 +6,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
-import json
+import orjson
 import random
 import string
 from zerobouncesdk import ZeroBounce, ZBException, ZBValidateStatus
@@ -16,7 +17,7 @@ from zerobouncesdk import ZeroBounce, ZBException, ZBValidateStatus
 from database import get_db, get_valkey_connection
 from models import User, GoogleService
 from dto import UserDto, CreateUserDto, TokenData, LoginDto, ConversationDto
-from repositories import UserRepository, ConversationRepository, MessageRepository, ProjectRepository
+from repositories import UserRepository, ConversationRepository, AsyncConversationRepository, MessageRepository, ProjectRepository
 from auth import create_access_token
 from core.config import settings
 from services.google_oauth_service import GoogleOAuthService
@@ -92,7 +93,6 @@ def register_user(user_data: CreateUserDto, db: Session) -> UserDto:
         
         db.add(user)
         db.commit()
-        db.refresh(user)
 
         return UserDto(
             email=user.email,
@@ -120,7 +120,7 @@ def authenticate_user(email: str, password: str, db: Session) -> Optional[User]:
     user_repo = UserRepository(db)
     
     # Get user
-    user = user_repo.get_by_email(email)
+    user = user_repo.get_by_email_with_password(email)
     
     # Verify password if user exists
     if not user or not pwd_context.verify(password, user.password):
@@ -151,18 +151,8 @@ def get_users(db: Session, skip: int = 0, limit: int = 50) -> List[UserDto]:
     # Initialize repository
     user_repo = UserRepository(db)
     
-    # Get users
-    users = user_repo.get_all()
-    
-    # Convert to DTOs
-    return [
-        UserDto(
-            email=user.email,
-            first_name=user.first_name,
-            last_name=user.last_name
-        )
-        for user in users
-    ]
+    # Get a page of users as DTOs, built straight from the selected columns
+    return user_repo.list_dtos(skip=skip, limit=limit)
 
 def update_user(email: str, user_data: dict, db: Session) -> Optional[UserDto]:
     """Update a user's information."""
@@ -241,7 +231,7 @@ async def _generate_auth_response(user: User, db: Session) -> dict:
 async def login_user(login_data: LoginDto, db: Session) -> dict:
     """Authenticate user and return JWT token."""
     user_repo = UserRepository(db)
-    user = user_repo.get_by_email(login_data.email)
+    user = user_repo.get_by_email_with_password(login_data.email)
 
     if not user or not pwd_context.verify(login_data.password, user.password):
         raise HTTPException(
@@ -277,7 +267,6 @@ async def get_or_create_google_user(email: str, first_name: str, last_name: str,
         try:
             db.add(new_user_data)
             db.commit()
-            db.refresh(new_user_data)
             user = new_user_data
         except IntegrityError: 
             db.rollback()
@@ -330,7 +319,7 @@ async def rename_conversation(conversation_id: str, new_name: str, current_user_
     
     # Perform the rename
     try:
-        updated_conversation = conversation_repo.update(conversation_id, {"name": new_name})
+        updated_conversation = conversation_repo.update(conversation_id, {"name": new_name}, returning_state=True)
         if updated_conversation:
             logger.info(f"Conversation {conversation_id} renamed to '{new_name}' by user {current_user_email}")
             return conversation_repo.to_dto(updated_conversation)
@@ -384,7 +373,8 @@ async def delete_conversation(conversation_id: str, current_user_email: str, db:
 
     # Perform Deletion
     try:
-        deleted = conversation_repo.delete_conversation(conversation_id)
+        # Inherited delete: one DELETE; messages go with it through the FK's ON DELETE CASCADE
+        deleted = conversation_repo.delete(conversation_id)
         if deleted:
             logger.info(f"Conversation {conversation_id} deleted successfully by user {current_user_email}")
             return None 
@@ -430,7 +420,7 @@ async def get_conversation_details(conversation_id: str, current_user_email: str
 
     # Cache miss or Redis error, fetch from DB
     conversation_repo = ConversationRepository(db)
-    conversation = conversation_repo.get_by_id(conversation_id)
+    conversation = conversation_repo.get_by_id(conversation_id, include_state=True)
 
     if not conversation:
         logger.warning(f"Conversation {conversation_id} not found in DB.")
@@ -454,7 +444,7 @@ async def get_conversation_details(conversation_id: str, current_user_email: str
     # Add latest message if your DTO and to_dto method handle it
     # This might require fetching the latest message separately if not already part of 'conversation'
     message_repo = MessageRepository(db)
-    latest_messages = message_repo.get_for_conversation(conversation_id, limit=1, offset=0)
+    latest_messages = message_repo.get_for_conversation(conversation_id, limit=1)
     if latest_messages:
         conversation_dto.latest_message = message_repo.to_dto(latest_messages[0])
 
@@ -471,7 +461,7 @@ async def get_conversation_details(conversation_id: str, current_user_email: str
 
     return conversation_dto
 
-async def get_user_conversations(current_user_email: str, db: Session = None):
+async def get_user_conversations(current_user_email: str, db: AsyncSession = None):
     """
     Get all conversations belonging to a user with essential details.
     Implements cache-aside (lazy loading) pattern with Redis.
@@ -485,7 +475,7 @@ async def get_user_conversations(current_user_email: str, db: Session = None):
             cached_data_json = await redis_conn.get(cache_key)
             if cached_data_json:
                 logger.info(f"Cache HIT for user conversations summary: {cache_key}")
-                return json.loads(cached_data_json) # Deserialize from JSON string
+                return orjson.loads(cached_data_json) # Deserialize from JSON string
             else:
                 logger.info(f"Cache MISS for user conversations summary: {cache_key}")
         except Exception as e:
@@ -493,24 +483,18 @@ async def get_user_conversations(current_user_email: str, db: Session = None):
             # Proceed to fetch from DB if Redis fails
 
     # Cache miss or Redis error, fetch from DB
-    conversation_repo = ConversationRepository(db)
+    conversation_repo = AsyncConversationRepository(db)
     
-    # Get all conversations for user (no limit), ordered by updated_at descending (newest first)
-    conversations = conversation_repo.get_for_user(
+    # Get all conversations for user (no limit), ordered by updated_at descending (newest first).
+    # Only the summary columns are selected; the JSON state never leaves the database.
+    conversations = await conversation_repo.get_summaries_for_user(
         current_user_email, 
         limit=0, 
         ascending=False  # Get newest first
     )
     
     # Extract only the essential details
-    conversation_list = []
-    for conversation in conversations:
-        conversation_list.append({
-            "id": conversation.id,
-            "name": conversation.name,
-            "updated_at": conversation.updated_at.isoformat() if conversation.updated_at else None,
-            "is_pinned": conversation.is_pinned
-        })
+    conversation_list = [conversation.to_response_dict() for conversation in conversations]
     
     logger.info(f"Retrieved {len(conversation_list)} conversations for user {current_user_email} from DB")
     
@@ -521,7 +505,7 @@ async def get_user_conversations(current_user_email: str, db: Session = None):
 
     if redis_conn:
         try:
-            result_data_json = json.dumps(result_data) # Serialize to JSON string
+            result_data_json = orjson.dumps(result_data) # Serialize to JSON bytes
             await redis_conn.set(cache_key, result_data_json, ex=USER_CONVERSATIONS_CACHE_TTL_SECONDS)
             logger.info(f"Stored user conversations summary in cache: {cache_key} with TTL {USER_CONVERSATIONS_CACHE_TTL_SECONDS}s")
         except Exception as e:
@@ -567,7 +551,7 @@ async def toggle_conversation_pin(conversation_id: str, current_user_email: str,
     
     # Toggle the pin status
     try:
-        updated_conversation = conversation_repo.toggle_pin(conversation_id)
+        updated_conversation = conversation_repo.toggle_pin(conversation_id, returning_state=True)
         if updated_conversation:
             new_status = "pinned" if updated_conversation.is_pinned else "unpinned"
             logger.info(f"Conversation {conversation_id} {new_status} by user {current_user_email}")
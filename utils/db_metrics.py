@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# A single request issuing more statements than this is most likely an N+1 loop
+QUERY_COUNT_WARN_THRESHOLD = 10
+
+class QueryCounter:
+    """Number of statements and total time spent in the database for one unit of work."""
+
+    __slots__ = ("count", "total_ns")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0  # Integer nanoseconds: no float accumulation error
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_ns / 1_000_000
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("db_query_counter", default=None)
+
+# Process-wide totals; only touched once per unit of work (see merge_into_totals), never per query
+_totals: Counter = Counter()
+_totals_lock = threading.Lock()
+
+# The start time lives on the statement's ExecutionContext, not on the pooled connection, so a
+# statement that raises (after_cursor_execute never fires) leaves nothing behind
+_START_ATTR = "_db_metrics_start_ns"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    setattr(context, _START_ATTR, time.monotonic_ns())
+
+def _record(context) -> None:
+    started_ns = getattr(context, _START_ATTR, None)
+    if started_ns is None:
+        return
+    delattr(context, _START_ATTR)
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+        counter.total_ns += time.monotonic_ns() - started_ns
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(context)
+
+def _handle_error(exception_context):
+    # Failed statements (e.g. a unique violation) are counted and timed too
+    if exception_context.execution_context is not None:
+        _record(exception_context.execution_context)
+
+def register_query_listeners(engine: Engine) -> None:
+    """Attaches the cursor listeners that feed count_queries(); call once at startup."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Counts the statements executed in the current context (request, task or thread)."""
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+def merge_into_totals(counter: QueryCounter) -> None:
+    """Folds a finished unit of work into the process-wide totals."""
+    with _totals_lock:
+        _totals["units"] += 1
+        _totals["queries"] += counter.count
+        _totals["duration_ns"] += counter.total_ns
+
+def totals_snapshot() -> Dict[str, int]:
+    """Returns a consistent copy of the process-wide totals."""
+    with _totals_lock:
+        return dict(_totals)
+
+def server_timing_header(counter: QueryCounter) -> str:
+    """Formats a counter as a Server-Timing header value."""
+    return f'db-queries;dur={counter.total_ms:.1f};desc="n={counter.count}"'
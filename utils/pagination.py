@@ -0,0 +1,33 @@
+import base64
+import datetime
+from typing import Any, List
+
+import orjson
+
+def encode_cursor(*values: Any) -> str:
+    """Packs the keyset values of the last row of a page into an opaque, URL-safe cursor string."""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """
+    Unpacks a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not hold `length` values
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:  # binascii.Error and orjson.JSONDecodeError are both ValueErrors
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    return values
+
+def parse_cursor_timestamp(value: Any) -> datetime.datetime:
+    """Turns a cursor's ISO 8601 timestamp back into a datetime."""
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor timestamp")
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError("Invalid cursor timestamp") from e